@@ -0,0 +1,2 @@
+# benchmarks
+# 합성 payload + 로컬 n8n stub 기반 성능 측정 (저장소 루트에서 python -m benchmarks.run)
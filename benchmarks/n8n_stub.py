@@ -0,0 +1,209 @@
+# benchmarks/n8n_stub.py
+# 로컬 n8n webhook 대역. 요청 본문의 month 에 맞는 합성 payload 를 돌려준다.
+#
+#   python -m benchmarks.n8n_stub --port 8765 --size medium --shape list --delay 2
+#   N8N_WEBHOOK_URL=http://127.0.0.1:8765/webhook streamlit run streamlit_app.py
+#   curl -X POST http://127.0.0.1:8765/bump                   # 데이터 리비전 올리기 (재검증 확인용)
+import argparse, gzip, hashlib, json, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import brotli
+except ImportError:                                 # 선택 의존성 (없으면 br 요청에도 gzip/무압축으로 응답)
+    brotli = None
+
+from benchmarks.synthetic import SHAPES, SIZES, encode_body, make_payload
+
+
+class N8nStub:
+    """ThreadingHTTPServer 기반 stub. with 문으로 띄우고 url 로 호출한다.
+
+    - rows/shape: 응답 payload 크기와 모양
+    - delay: 응답 전 대기 (워크플로 실행 시간 흉내)
+    - fail_every: N 번째 요청마다 429 (백오프 경로 확인용, 0 이면 끔)
+    - compress: True 면 요청의 Accept-Encoding 에 맞춰 br/gzip 으로 압축해 보낸다
+    - conditional: 응답에 ETag 를 붙이고, If-None-Match 가 현재 버전이면 본문 없이 304
+    - delta: If-None-Match 가 같은 달의 예전 리비전이면 바뀐 최상위 키만 보낸다 (X-Delta-Base)
+    - revision: 데이터 리비전. bump() (또는 POST /bump) 로 올리면 reply/restock_alerts 만 바뀐다
+    """
+
+    def __init__(self, rows: int = 1_000, shape: str = "list", delay: float = 0.0,
+                 fail_every: int = 0, compress: bool = False, conditional: bool = True, delta: bool = False,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.rows = rows
+        self.shape = shape
+        self.delay = delay
+        self.fail_every = fail_every
+        self.compress = compress
+        self.conditional = conditional
+        self.delta = delta
+        self.revision = 0
+        self.calls = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+        self._bodies = {}           # (month, revision, content-encoding, 델타 기준 리비전) → 응답, 한 번만 만든다
+        self._versions = {}         # (month, etag) → revision
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/webhook"
+
+    def bump(self) -> int:
+        with self._lock:
+            self.revision += 1
+            return self.revision
+
+    def raw_for(self, month: str, revision: int) -> dict:
+        p = make_payload(month, self.rows)
+        if revision:                # 리비전마다 일부 키만 바뀐다
+            p["reply"] = f"{p['reply']} (rev {revision})"
+            p["restock_alerts"] = p["restock_alerts"][revision:]
+        return p
+
+    def body_for(self, month: str, encoding: str = "identity", revision: int = None, base: int = None) -> tuple:
+        """(본문, content-type, etag, 델타 기준 etag 또는 None). base 가 있으면 그 리비전 대비 델타."""
+        rev = self.revision if revision is None else revision
+        key = (month, rev, encoding, base)
+        with self._lock:
+            hit = self._bodies.get(key)
+        if hit is None:
+            if encoding != "identity":
+                body, ctype, etag, delta_base = self.body_for(month, revision=rev, base=base)
+                body = brotli.compress(body, quality=5) if encoding == "br" else gzip.compress(body, 6)
+                hit = (body, ctype, etag, delta_base)
+            elif base is None:
+                body, ctype = encode_body(self.raw_for(month, rev), self.shape)
+                hit = (body, ctype, hashlib.sha1(body).hexdigest(), None)
+                with self._lock:
+                    self._versions[(month, hit[2])] = rev
+            else:
+                new, old = self.raw_for(month, rev), self.raw_for(month, base)
+                delta = {k: v for k, v in new.items() if old.get(k) != v}
+                body = json.dumps(delta, ensure_ascii=False).encode("utf-8")
+                hit = (body, "application/json; charset=utf-8", self.body_for(month, revision=rev)[2],
+                       self.body_for(month, revision=base)[2])
+            with self._lock:
+                self._bodies[key] = hit
+        return hit
+
+    def version_of(self, month: str, etag: str):
+        with self._lock:
+            return self._versions.get((month, etag))
+
+    def pick_encoding(self, accept: str) -> str:
+        if not self.compress:
+            return "identity"
+        offered = {a.split(";")[0].strip() for a in (accept or "").split(",")}
+        if "br" in offered and brotli is not None:
+            return "br"
+        return "gzip" if "gzip" in offered else "identity"
+
+    def _handler(self):
+        stub = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"       # keep-alive (앱의 연결 풀과 같은 조건)
+
+            def do_POST(self):
+                n = int(self.headers.get("Content-Length") or 0)
+                if self.path.split("?")[0] == "/bump":
+                    self.rfile.read(n)
+                    self._send(200, json.dumps({"revision": stub.bump()}).encode("utf-8"), "application/json")
+                    return
+                try:
+                    month = json.loads(self.rfile.read(n) or b"{}").get("month") or "2025-12"
+                except ValueError:
+                    month = "2025-12"
+                with stub._lock:
+                    stub.calls += 1
+                    throttled = stub.fail_every and stub.calls % stub.fail_every == 0
+                if stub.delay:
+                    time.sleep(stub.delay)
+                if throttled:
+                    self.send_response(429)
+                    self.send_header("Retry-After", "0")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                rev = stub.revision
+                encoding = stub.pick_encoding(self.headers.get("Accept-Encoding"))
+                base = None
+                if stub.conditional:
+                    known = (self.headers.get("If-None-Match") or "").strip().removeprefix("W/").strip('"')
+                    if known and known == stub.body_for(month, revision=rev)[2]:
+                        with stub._lock:
+                            stub.not_modified += 1
+                        self._send(304, b"", None, {"ETag": f'"{known}"'})
+                        return
+                    if known and stub.delta:
+                        base = stub.version_of(month, known)
+                body, ctype, etag, delta_base = stub.body_for(month, encoding, revision=rev, base=base)
+                headers = {}
+                if encoding != "identity":
+                    headers["Content-Encoding"] = encoding
+                if stub.conditional:
+                    headers["ETag"] = f'"{etag}"'
+                if delta_base:
+                    headers["X-Delta-Base"] = f'"{delta_base}"'
+                self._send(200, body, ctype, headers)
+
+            def _send(self, status: int, body: bytes, ctype, headers=None):
+                self.send_response(status)
+                if ctype:
+                    self.send_header("Content-Type", ctype)
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                if status != 304:
+                    self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return _Handler
+
+    def start(self) -> "N8nStub":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="n8n-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="로컬 n8n webhook stub")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--size", choices=list(SIZES), default="small")
+    ap.add_argument("--shape", choices=SHAPES, default="list")
+    ap.add_argument("--delay", type=float, default=0.0, help="응답 전 대기 (초)")
+    ap.add_argument("--fail-every", type=int, default=0, help="N 번째 요청마다 429")
+    ap.add_argument("--compress", action="store_true", help="Accept-Encoding 에 맞춰 br/gzip 압축")
+    ap.add_argument("--no-conditional", action="store_true", help="ETag/304 끄기")
+    ap.add_argument("--delta", action="store_true", help="예전 리비전 대비 바뀐 키만 응답")
+    args = ap.parse_args()
+    stub = N8nStub(rows=SIZES[args.size], shape=args.shape, delay=args.delay,
+                   fail_every=args.fail_every, compress=args.compress, conditional=not args.no_conditional,
+                   delta=args.delta, host=args.host, port=args.port)
+    print(f"n8n stub: {stub.url} (size={args.size}, shape={args.shape}, delay={args.delay}s)")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
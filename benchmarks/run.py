@@ -0,0 +1,139 @@
+# benchmarks/run.py
+# 핫패스 벤치마크. 합성 payload 로 정규화/디코딩/검색어 Top N/연휴 색인/테마 매칭/국가별 뷰와
+# 로컬 stub 대상 call_n8n 경로(fetch_payload) 전체와 조건부 재검증(304/델타)을 잰다. 실제 webhook 은 쓰지 않는다.
+#
+#   python -m benchmarks.run                                   # small, medium
+#   python -m benchmarks.run --sizes small,medium,large,xl --json bench.json
+#   python -m benchmarks.run --baseline bench.json             # 중앙값이 tolerance 이상 느려지면 exit 1
+import argparse, json, statistics, sys, time
+
+from benchmarks.n8n_stub import N8nStub
+from benchmarks.synthetic import REGIONS, SHAPES, SIZES, as_shape, encode_body, make_payload
+from http_pool import build_session
+from jsonutil import load_selected
+from n8n_client import STREAM_CHUNK_BYTES, fetch_payload
+from payload_model import PAYLOAD_KEYS, normalize_payload
+from payload_views import ThemeIndex, build_holiday_index, build_region_views, get_search_topN_df, theme_tokens
+
+MONTH = "2025-12"
+
+
+def _time(fn, repeat: int) -> list:
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def _chunks(body: bytes):
+    for i in range(0, len(body), STREAM_CHUNK_BYTES):
+        yield body[i:i + STREAM_CHUNK_BYTES]
+
+
+def _theme_match(data):
+    for rg in REGIONS:
+        index = ThemeIndex(data.rec_items(rg))
+        used = set()
+        for t in data.promo_items(rg)[:4]:
+            for it in index.top_for_theme(theme_tokens(t), used, k=5):
+                if it.sku:
+                    used.add(it.sku)
+
+
+def _holidays(data):
+    index = build_holiday_index(data.calendar)
+    for rg in REGIONS:
+        index.get((rg, 12), ())
+
+
+def run(sizes, shapes, repeat: int, e2e: bool) -> list:
+    results = []
+
+    def add(bench, size, shape, rows, times):
+        r = {"bench": bench, "size": size, "shape": shape, "rows": rows,
+             "best_ms": round(min(times) * 1000, 3), "median_ms": round(statistics.median(times) * 1000, 3)}
+        results.append(r)
+        print(f"{bench:<16} {size:<7} {shape:<12} {rows:>9,}  best {r['best_ms']:>10.2f} ms  median {r['median_ms']:>10.2f} ms",
+              flush=True)
+
+    for size in sizes:
+        rows = SIZES[size]
+        raw = make_payload(MONTH, rows)
+        data = None
+        for shape in shapes:
+            obj = as_shape(raw, shape)
+            add("normalize", size, shape, rows, _time(lambda: normalize_payload(obj), repeat))
+            body, _ = encode_body(raw, shape)
+            add("decode", size, shape, rows, _time(lambda: load_selected(_chunks(body), PAYLOAD_KEYS), repeat))
+            if data is None:
+                data = normalize_payload(obj)
+        add("search_topn", size, "-", rows, _time(lambda: get_search_topN_df(data, MONTH, topn=10), repeat))
+        add("holidays", size, "-", rows, _time(lambda: _holidays(data), repeat))
+        add("theme_match", size, "-", rows, _time(lambda: _theme_match(data), repeat))
+        add("region_views", size, "-", rows, _time(lambda: build_region_views(data, MONTH, REGIONS), repeat))
+        if e2e:
+            sess = build_session()
+            for shape in shapes:
+                for compress in (False, True):
+                    with N8nStub(rows=rows, shape=shape, compress=compress) as stub:
+                        # 본문 생성/압축 시간은 빼고 잰다
+                        stub.body_for(MONTH, stub.pick_encoding(sess.headers.get("Accept-Encoding")))
+                        label = f"{shape}+{stub.pick_encoding(sess.headers.get('Accept-Encoding'))}" if compress else shape
+                        add("call_n8n", size, label, rows, _time(lambda: fetch_payload(sess, stub.url, MONTH), repeat))
+            # 조건부 재검증: 변경 없음(304) / 일부 키만 바뀐 델타
+            with N8nStub(rows=rows, delta=True) as stub:
+                prev = fetch_payload(sess, stub.url, MONTH)
+                add("revalidate_304", size, "-", rows, _time(lambda: fetch_payload(sess, stub.url, MONTH, prev=prev), repeat))
+                stub.bump()
+                stub.body_for(MONTH, base=0)
+                add("revalidate_delta", size, "-", rows, _time(lambda: fetch_payload(sess, stub.url, MONTH, prev=prev), repeat))
+        del raw, data
+    return results
+
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    base = {(b["bench"], b["size"], b["shape"]): b for b in baseline}
+    slower = []
+    for r in results:
+        b = base.get((r["bench"], r["size"], r["shape"]))
+        if b and b["median_ms"] > 0 and r["median_ms"] > b["median_ms"] * (1 + tolerance):
+            slower.append((r, b))
+    return slower
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="n8n 대시보드 핫패스 벤치마크")
+    ap.add_argument("--sizes", default="small,medium", help=f"쉼표 구분 ({', '.join(SIZES)})")
+    ap.add_argument("--shapes", default=",".join(SHAPES), help=f"쉼표 구분 ({', '.join(SHAPES)})")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--no-e2e", action="store_true", help="stub 대상 call_n8n 측정 생략")
+    ap.add_argument("--json", help="결과를 JSON 으로 저장")
+    ap.add_argument("--baseline", help="비교할 이전 결과 JSON")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="허용 느려짐 비율 (기본 25%%)")
+    args = ap.parse_args(argv)
+
+    sizes = [s for s in args.sizes.split(",") if s]
+    shapes = [s for s in args.shapes.split(",") if s]
+    unknown = [s for s in sizes if s not in SIZES] + [s for s in shapes if s not in SHAPES]
+    if unknown:
+        ap.error(f"알 수 없는 값: {', '.join(unknown)}")
+
+    results = run(sizes, shapes, max(1, args.repeat), not args.no_e2e)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            slower = compare(results, json.load(f), args.tolerance)
+        for r, b in slower:
+            print(f"REGRESSION {r['bench']} {r['size']} {r['shape']}: {b['median_ms']:.2f} → {r['median_ms']:.2f} ms",
+                  file=sys.stderr)
+        if slower:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+# benchmarks/synthetic.py
+# 합성 n8n 응답 생성기. 실제 webhook 없이 작은 크기부터 100만 행까지 같은 모양의 payload 를 만든다.
+# _as_dict 가 받는 모든 모양(dict / {"json": ...} 리스트 / 코드펜스 JSON 문자열)으로 내보낼 수 있다.
+import json, random
+
+REGIONS = ("KR", "JP", "CN", "SEA")
+
+# catalog_raw / search_data_raw 행 수
+SIZES = {
+    "small": 1_000,
+    "medium": 50_000,
+    "large": 250_000,
+    "xl": 1_000_000,
+}
+
+# _as_dict 가 받아들이는 모양
+SHAPES = ("dict", "list", "list_split", "json_string", "fenced")
+
+_WORDS = ("립스틱", "향수", "세럼", "크림", "쿠션", "마스크팩", "위스키", "초콜릿", "선글라스", "시계",
+          "lip", "perfume", "serum", "cream", "gift", "set", "limited", "travel", "mini", "duo")
+_CATEGORIES = ("뷰티", "향수", "주류", "식품", "패션", "잡화", "전자")
+_THEMES = ("립스틱 페스타", "향수 위크", "연말 선물 세트", "여행 필수템", "주류 기획전", "스킨케어 루틴")
+
+
+def make_payload(month: str, rows: int, rec_per_region: int = 200, seed: int = 0) -> dict:
+    """month 기준 합성 payload (정규화 전 원본 dict). rows 는 catalog/search 행 수."""
+    rnd = random.Random(f"{seed}-{month}-{rows}")
+    yyyy, mm = month.split("-")
+    mm = int(mm)
+    names = [f"{rnd.choice(_WORDS)} {rnd.choice(_WORDS)}" for _ in range(997)]     # 소수의 반복 문자열로 메모리 절약
+    catalog = [
+        {"sku": f"SKU{i:07d}", "name": names[i % 997], "category": _CATEGORIES[i % len(_CATEGORIES)],
+         "price": 1000 + (i * 37) % 90000, "stock": (i * 13) % 500}
+        for i in range(rows)
+    ]
+    # 검색어는 여러 달이 섞여 있고 월 표기도 제각각 (월 필터 경로를 타게)
+    month_forms = (month, f"{yyyy}{mm:02d}", mm, f"{mm}월", float(mm), f"{yyyy}-{(mm % 12) + 1:02d}")
+    search = [
+        {"Keyword": f"{names[(i * 7) % 997]} {i}", "Rank": (i % 1000) + 1 if i % 3 else None,
+         "month": month_forms[i % len(month_forms)], "search_volume": (i * 7919) % 100_000}
+        for i in range(rows)
+    ]
+    calendar = [
+        {"country": rg, "date": f"{yyyy}-{m:02d}-{d:02d}", "name": f"{rg} 휴일 {m}-{d}"}
+        for rg in REGIONS for m in range(1, 13) for d in (1, 15, 25)
+    ]
+    regions = {
+        rg: {
+            "macro_issue": f"{rg} 이슈1, {rg} 이슈2",
+            "shopping_trend": "뷰티; 향수; 주류",
+            "consumer_behavior": "선물 수요 증가",
+            "hashtags": {"macro_issue": ["여행", rg], "shopping_trend": ["뷰티"]},
+        }
+        for rg in REGIONS
+    }
+    rec = [
+        {"region": rg, "items": [
+            {"sku": f"{rg}{i:05d}", "name": names[(i * 31) % 997], "category": _CATEGORIES[i % len(_CATEGORIES)],
+             "stock": (i * 11) % 300, "suggested_mechanic": "1+1" if i % 2 else "10% off",
+             "scores": {"final": round(rnd.random(), 4)}}
+            for i in range(rec_per_region)
+        ]}
+        for rg in REGIONS
+    ]
+    promos = [
+        {"region": rg, "items": [{"theme": th, "products": th.split()[:1]} for th in rnd.sample(_THEMES, 5)]}
+        for rg in REGIONS
+    ]
+    return {
+        "reply": f"{month} 프로모션 추천",
+        "ats": {"month": month, "regions": regions},
+        "calendar_raw": calendar,
+        "search_data_raw": search,
+        "catalog_raw": catalog,
+        "recommended_products_by_region": rec,
+        "restock_alerts": [{"sku": f"SKU{i:07d}", "stock": 0} for i in range(0, rows, max(1, rows // 50))],
+        "promotions_by_region": promos,
+        # 정규화에서 쓰지 않는 큰 값 (선택 디코딩이 건너뛰는 경로)
+        "debug_trace": [{"node": f"n{i}", "output": "x" * 64} for i in range(max(1, rows // 10))],
+    }
+
+
+def as_shape(payload: dict, shape: str):
+    """payload 를 _as_dict 가 받는 모양으로."""
+    if shape == "dict":
+        return payload
+    if shape == "list":                     # n8n 기본 응답: [{"json": {...}}]
+        return [{"json": payload}]
+    if shape == "list_split":               # 노드마다 키 하나씩 돌려주는 워크플로
+        return [{"json": {k: v}} for k, v in payload.items()]
+    if shape == "json_string":
+        return json.dumps(payload, ensure_ascii=False)
+    if shape == "fenced":                   # LLM 응답처럼 코드펜스로 감싼 문자열
+        return "```json\n" + json.dumps(payload, ensure_ascii=False) + "\n```"
+    raise ValueError(f"unknown shape: {shape}")
+
+
+def encode_body(payload: dict, shape: str) -> tuple:
+    """HTTP 응답 본문 (bytes, content-type).
+    json_string 은 JSON 문자열 값 하나("{\\"reply\\": ...}"), fenced 는 코드펜스 텍스트 그대로 보낸다."""
+    obj = as_shape(payload, shape)
+    if shape == "fenced":
+        return obj.encode("utf-8"), "text/plain; charset=utf-8"
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8"
@@ -0,0 +1,109 @@
+# bulk_fetch.py
+# 여러 달을 한 번에 받는 일괄 수집.
+# 분기 기획처럼 3~6개월을 같이 볼 때 월별 호출을 제한된 동시성으로 나란히 돌려,
+# 전체 시간이 "호출 시간의 합"이 아니라 "가장 느린 호출" 정도가 되게 한다.
+# n8n 이 429 를 돌려주면 동시성을 절반으로 줄이고 지수 백오프 후 다시 시도한다 (성공하면 하나씩 되돌림).
+import logging, random, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from urllib3.exceptions import ResponseError
+
+log = logging.getLogger(__name__)
+
+
+def month_range(start_ym: str, n: int) -> list:
+    """start_ym 부터 n 개월 (YYYY-MM) 목록."""
+    y, m = map(int, start_ym.split("-"))
+    out = []
+    for i in range(max(0, int(n))):
+        k = (m - 1) + i
+        out.append(f"{y + k // 12:04d}-{k % 12 + 1:02d}")
+    return out
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    """429 응답(세션 Retry 까지 소진된 경우 포함)인지."""
+    if isinstance(exc, requests.exceptions.HTTPError):
+        return getattr(exc.response, "status_code", None) == 429
+    if isinstance(exc, requests.exceptions.RetryError):
+        # urllib3 MaxRetryError(reason=ResponseError("too many 429 error responses")) 를 감싼 형태.
+        # 메시지에는 URL 도 들어가므로(포트/웹훅 UUID 의 '429') 사유만 본다
+        reason = getattr(exc.args[0] if exc.args else None, "reason", None)
+        return isinstance(reason, ResponseError) and str(reason) == ResponseError.SPECIFIC_ERROR.format(status_code=429)
+    return False
+
+
+class _AdaptiveLimit:
+    """AIMD 동시성 제한: 429 면 절반으로, 성공하면 1씩 늘린다 (1 ~ max_limit)."""
+
+    def __init__(self, max_limit: int):
+        self.max_limit = max(1, int(max_limit))
+        self.limit = self.max_limit
+        self.active = 0
+        self._cond = threading.Condition()
+
+    def __enter__(self):
+        with self._cond:
+            while self.active >= self.limit:
+                self._cond.wait()
+            self.active += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    def on_success(self) -> None:
+        with self._cond:
+            if self.limit < self.max_limit:
+                self.limit += 1
+                self._cond.notify_all()
+
+    def on_throttle(self) -> None:
+        with self._cond:
+            self.limit = max(1, self.limit // 2)
+
+
+class BulkFetcher:
+    def __init__(self, loader, max_workers: int = 4, max_attempts: int = 4,
+                 base_delay: float = 2.0, max_delay: float = 30.0):
+        self.loader = loader            # loader(webhook, month) -> payload
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="n8n-bulk")
+        self._max_workers = max_workers
+
+    def fetch(self, webhook: str, months) -> dict:
+        """months 를 동시에 받아 {month: payload 또는 Exception} 으로 반환 (입력 순서 유지).
+        한 달이 실패해도 나머지는 그대로 돌려준다."""
+        months = list(dict.fromkeys(months))
+        limit = _AdaptiveLimit(self._max_workers)
+        futures = {m: self._pool.submit(self._fetch_one, webhook, m, limit) for m in months}
+        out = {}
+        for m, fut in futures.items():
+            try:
+                out[m] = fut.result()
+            except Exception as e:
+                out[m] = e
+        return out
+
+    def _fetch_one(self, webhook: str, month: str, limit: _AdaptiveLimit):
+        for attempt in range(1, self.max_attempts + 1):
+            with limit:
+                try:
+                    res = self.loader(webhook, month)
+                except Exception as e:
+                    if not is_rate_limited(e) or attempt == self.max_attempts:
+                        raise
+                    limit.on_throttle()
+                else:
+                    limit.on_success()
+                    return res
+            # 슬롯을 놓고 기다린다 (다른 달이 줄어든 동시성 안에서 먼저 진행할 수 있게)
+            delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+            log.info("bulk_fetch: 429, %s 재시도 %d/%d (%.1fs 후, 동시성 %d)",
+                     month, attempt, self.max_attempts - 1, delay, limit.limit)
+            time.sleep(delay)
@@ -0,0 +1,62 @@
+# cache_warmer.py
+# 인접 월 선조회 + 주기적 캐시 워밍.
+# 기획자는 월을 한 칸씩 넘겨 보므로, 선택 월의 이전/다음 달을 미리 디스크 캐시에 채워 둔다.
+import logging, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+
+class CacheWarmer:
+    def __init__(self, cache, loader, max_workers: int = 2):
+        self.cache = cache          # payload_cache.PersistentCache
+        self.loader = loader        # loader(webhook, month, prev) -> payload (PersistentCache 와 같은 계약)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="n8n-prefetch")
+        self._lock = threading.Lock()
+        self._inflight = set()
+        self._schedule = None
+
+    def prefetch(self, webhook: str, months) -> list:
+        """캐시에 신선한 값이 없는 월만 제한된 동시성으로 미리 받아 둔다. 제출한 월 목록을 반환."""
+        submitted = []
+        for month in months:
+            key = (webhook, month)
+            with self._lock:
+                if key in self._inflight:
+                    continue
+                self._inflight.add(key)
+            if self.cache.is_loading(webhook, month) or self.cache.is_fresh(webhook, month):
+                with self._lock:
+                    self._inflight.discard(key)
+                continue
+            self._pool.submit(self._run, key)
+            submitted.append(month)
+        return submitted
+
+    def _run(self, key):
+        webhook, month = key
+        try:
+            self.cache.refresh(webhook, month, self.loader)
+        except Exception as e:
+            log.warning("cache_warmer: 선조회 실패 (%s, %s): %s", webhook, month, e)
+        finally:
+            with self._lock:
+                self._inflight.discard(key)
+
+    def start_schedule(self, webhook: str, months_fn, interval: float) -> None:
+        """시작 즉시 1회, 이후 interval 초마다 months_fn() 의 월들을 워밍. interval<=0 이면 시작 시 1회만."""
+        if self._schedule is not None:
+            return
+
+        def _loop():
+            while True:
+                try:
+                    self.prefetch(webhook, months_fn())
+                except Exception as e:
+                    log.warning("cache_warmer: 워밍 실패: %s", e)
+                if interval <= 0:
+                    return
+                time.sleep(interval)
+
+        self._schedule = threading.Thread(target=_loop, name="n8n-cache-warmer", daemon=True)
+        self._schedule.start()
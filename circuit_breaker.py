@@ -0,0 +1,83 @@
+# circuit_breaker.py
+# webhook 장애 시 호출을 잠시 끊는 회로 차단기.
+# 연속 실패가 failure_threshold 번이면 open: reset_timeout 동안은 호출하지 않고 바로 CircuitOpenError.
+# 그 뒤 한 번만 시험 호출(half-open)을 허용해 성공하면 닫고, 실패하면 다시 연다.
+# ignore(e) 가 참인 예외(예: 429)는 장애로 세지 않는다 (호출 측이 속도를 줄여 처리할 일).
+import threading, time
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60.0, name: str = "", ignore=None):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = float(reset_timeout)
+        self.name = name
+        self.ignore = ignore        # ignore(exc) -> bool: 실패로 세지 않을 예외
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial = False         # half-open 시험 호출이 진행 중인지
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def retry_in(self) -> float:
+        """open 상태면 시험 호출까지 남은 초 (아니면 0)."""
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def before_call(self) -> None:
+        """호출 전에 부른다. 차단 중이면 CircuitOpenError."""
+        with self._lock:
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    raise CircuitOpenError(f"{self.name or 'webhook'} 호출 차단 중 (연속 {self._failures}회 실패)")
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN:
+                if self._trial:
+                    raise CircuitOpenError(f"{self.name or 'webhook'} 복구 확인 중")
+                self._trial = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """성공도 실패도 아닌 결과: 상태/실패 수는 그대로 두고 half-open 시험 자리만 푼다."""
+        with self._lock:
+            self._trial = False
+
+    def call(self, fn, *args, **kwargs):
+        self.before_call()
+        try:
+            res = fn(*args, **kwargs)
+        except BaseException as e:
+            if self.ignore is not None and self.ignore(e):
+                self.release()
+            else:
+                self.record_failure()
+            raise
+        self.record_success()
+        return res
@@ -0,0 +1,247 @@
+# history_store.py
+# 받아 온 달의 정규화 payload 를 월/국가로 나눈 Parquet 에 쌓아 두는 이력 저장소.
+# 캐시 항목이 만료돼도 남으므로 "JP 에서 키워드 X 의 최근 12개월 순위" 같은 질의를 webhook 호출 없이
+# 컬럼 스캔(필요한 컬럼 + 파티션만 읽음)으로 답한다.
+#   <root>/<table>/month=YYYY-MM/region=XX/part-<파일 토큰>.parquet  table: search / calendar / recommended / ats
+# 파일 토큰은 버전(content_hash = 서버 ETag, '/' '+' 등이 들어갈 수 있음)의 sha1, region 값은 URI 인코딩 (hive 조회 시 복원)
+# 같은 달을 다시 받으면 새 버전 파일을 옆에 쓰고 _index 의 버전을 바꾼 뒤(조회는 _index 의 버전 파일만 읽는다)
+# 그 전전 버전부터 지운다. 직전 버전은 그때 읽고 있던 조회를 위해 다음 쓰기까지 남겨 둔다 (달마다 최신 한 벌).
+import glob, hashlib, json, logging, os, re, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:                                 # 선택 의존성 (없으면 이력 저장/조회를 끈다)
+    pa = ds = pq = None
+
+from payload_views import TREND_SECTIONS, as_list, month_numbers, search_frame
+
+log = logging.getLogger(__name__)
+
+ALL = "ALL"                                         # 국가 구분이 없는 행 (검색어에 region/country 컬럼이 없을 때)
+TABLES = ("search", "calendar", "recommended", "ats")
+_MONTH = re.compile(r"\d{4}-\d{2}")
+
+
+def _file_token(version: str) -> str:
+    # 경로에 그대로 쓸 수 있는 버전 표기
+    return hashlib.sha1(version.encode("utf-8")).hexdigest()
+
+
+def _segment(value) -> str:
+    # 파티션 값을 경로 한 칸으로: '/' '..' 등이 트리 밖으로 나가지 않게 모두 인코딩
+    return quote(str(value), safe="")
+
+
+# ---- payload → 표 (month/region 은 파티션 경로에 들어가므로 region 컬럼은 나눌 때만 쓴다) ----
+def _region_col(df: pd.DataFrame) -> pd.Series:
+    for c in ("region", "country"):
+        if c in df.columns:
+            return df[c].fillna(ALL).astype(str)
+    return pd.Series(ALL, index=df.index)
+
+
+def search_rows(data, month: str) -> pd.DataFrame:
+    """그 달 행만 (검색어 데이터에는 여러 달이 섞여 온다)."""
+    df = search_frame(data.search_data)
+    if df.empty:
+        return pd.DataFrame(columns=["region", "keyword", "rank", "search_volume"])
+    df = df[month_numbers(df["month"]) == int(month.split("-")[1])]
+    return pd.DataFrame({
+        "region": _region_col(df),
+        "keyword": df["keyword"].astype(str),
+        "rank": df["rank"].astype("int32"),
+        "search_volume": df["search_value"].astype("float64"),
+    })
+
+
+def calendar_rows(data) -> pd.DataFrame:
+    df = pd.DataFrame(data.calendar)
+    if df.empty or not {"date", "country", "name"} <= set(df.columns):
+        return pd.DataFrame(columns=["region", "date", "name"])
+    df = df.dropna(subset=["country", "name"])
+    return pd.DataFrame({"region": df["country"].astype(str), "date": df["date"].astype(str), "name": df["name"].astype(str)})
+
+
+def recommended_rows(data) -> pd.DataFrame:
+    rows = [
+        (region, str(it.sku or ""), str(it.name or ""), str(it.category or ""), it.stock, it.suggested_mechanic, it.score)
+        for region, items in data.rec_by_region.items() for it in items
+    ]
+    df = pd.DataFrame(rows, columns=["region", "sku", "name", "category", "stock", "suggested_mechanic", "score"])
+    df["stock"] = pd.to_numeric(df["stock"], errors="coerce")
+    df["suggested_mechanic"] = df["suggested_mechanic"].map(lambda x: "" if x is None else str(x))
+    df["score"] = pd.to_numeric(df["score"], errors="coerce")
+    return df
+
+
+def ats_rows(data) -> pd.DataFrame:
+    # 국가당 한 행, TREND_SECTIONS 의 각 항목은 ' · ' 로 이은 문자열
+    cols = [key for _, key in TREND_SECTIONS]
+    rows = [[region] + [" · ".join(as_list(info.get(key))) for key in cols] for region, info in data.regions.items()]
+    return pd.DataFrame(rows, columns=["region"] + cols)
+
+
+def _entry_token(entry: dict):
+    # 파일 토큰이 없는 예전 _index 항목은 버전을 그대로 파일 이름에 썼다
+    return entry.get("file", entry.get("version"))
+
+
+_BUILDERS = {
+    "search": search_rows,
+    "calendar": lambda data, month: calendar_rows(data),
+    "recommended": lambda data, month: recommended_rows(data),
+    "ats": lambda data, month: ats_rows(data),
+}
+
+
+class HistoryStore:
+    def __init__(self, root: str):
+        self.root = root
+        self.enabled = pa is not None
+        self._lock = threading.Lock()                 # _index
+        self._write_lock = threading.Lock()           # 같은 달 버전 파일을 쓰고 지우는 쓰기끼리
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-write")
+        self._index_path = os.path.join(root, "_index.json")
+        self._index = self._read_index()           # month → {"version", "file", "written_at"}
+
+    # ---- 쓰기 ----
+    def _read_index(self) -> dict:
+        try:
+            with open(self._index_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def append_async(self, month: str, payload) -> None:
+        """fetch 경로를 막지 않도록 전용 스레드 하나에서 순서대로 쓴다."""
+        if self.enabled and not payload.stale and self._index.get(month, {}).get("version") != payload.content_hash:
+            self._pool.submit(self._append_logged, month, payload)
+
+    def _append_logged(self, month: str, payload) -> None:
+        try:
+            self.append(month, payload)
+        except Exception as e:
+            log.warning("history_store: %s 저장 실패: %s", month, e)
+
+    def append(self, month: str, payload) -> bool:
+        """month 의 파티션을 payload 내용으로 바꾼다. 같은 버전이 이미 있거나 빈 payload 면 False."""
+        if not self.enabled or payload.is_empty() or payload.stale:
+            return False
+        version = payload.content_hash or "nohash"
+        if not _MONTH.fullmatch(month):
+            raise ValueError(f"잘못된 월: {month!r}")
+        token = _file_token(version)
+        with self._write_lock:
+            with self._lock:
+                prev = self._index.get(month, {})
+                if prev.get("version") == version:
+                    return False
+            # 새 버전 파일은 _index 를 바꾸기 전까지 조회에 보이지 않으므로 조회 잠금(_lock) 밖에서 쓴다
+            for table, build in _BUILDERS.items():
+                self._write_month(table, month, build(payload, month), token)
+            with self._lock:
+                self._index[month] = {"version": version, "file": token, "written_at": time.time()}
+                os.makedirs(self.root, exist_ok=True)
+                tmp = self._index_path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(self._index, f)
+                os.replace(tmp, self._index_path)
+            for table in _BUILDERS:
+                self._prune_month(table, month, keep={token, _entry_token(prev)})
+            return True
+
+    def _month_files(self, table: str, month: str, token: str = "*") -> list:
+        return glob.glob(os.path.join(self.root, table, f"month={month}", "region=*", f"part-{token}.parquet"))
+
+    def _write_month(self, table: str, month: str, df: pd.DataFrame, token: str) -> None:
+        base = os.path.join(self.root, table, f"month={month}")
+        for region, part in df.groupby("region", sort=False):
+            d = os.path.join(base, f"region={_segment(region)}")
+            os.makedirs(d, exist_ok=True)
+            # '.' 로 시작하는 임시 파일에 다 쓴 뒤 이름을 바꾼다 (데이터셋 탐색은 '.'/'_' 로 시작하는 경로를 무시)
+            path = os.path.join(d, f"part-{token}.parquet")
+            tmp = os.path.join(d, f".part-{token}.parquet.tmp")
+            pq.write_table(pa.Table.from_pandas(part.drop(columns="region"), preserve_index=False), tmp)
+            os.replace(tmp, path)
+
+    def _prune_month(self, table: str, month: str, keep: set) -> None:
+        for path in self._month_files(table, month):
+            if os.path.basename(path)[len("part-"):-len(".parquet")] not in keep:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    # ---- 조회 ----
+    def months(self) -> list:
+        with self._lock:
+            return sorted(self._index)
+
+    def _scan(self, table: str, columns: list, months=None, regions=None, where=None) -> pd.DataFrame:
+        # 필요한 컬럼만, 월/국가는 파티션 경로로 걸러 해당 파일만 읽는다 (where 는 파일 안 행 필터)
+        # 달마다 _index 에 올라간 버전 파일만 읽는다 (쓰는 중인 새 버전/지울 예정인 이전 버전은 보지 않음)
+        empty = pd.DataFrame(columns=["month", "region"] + columns)
+        if not self.enabled:
+            return empty
+        wanted = None if months is None else set(months)
+        with self._lock:
+            tokens = {m: _entry_token(e) for m, e in self._index.items() if wanted is None or m in wanted}
+        files = [f for m, t in tokens.items() for f in self._month_files(table, m, glob.escape(t))]
+        if not files:
+            return empty
+        part = ds.partitioning(pa.schema([("month", pa.string()), ("region", pa.string())]), flavor="hive")
+        expr = where
+        if regions is not None:
+            f = ds.field("region").isin(list(regions))
+            expr = f if expr is None else expr & f
+        try:
+            dset = ds.dataset(files, format="parquet", partitioning=part,
+                              partition_base_dir=os.path.join(self.root, table))
+            return dset.to_table(columns=["month", "region"] + columns, filter=expr).to_pandas()
+        except (OSError, pa.ArrowException) as e:
+            # 파일이 사라졌거나 깨졌으면 조회를 실패시키지 않고 빈 표 (다음 쓰기/조회 때 다시 맞춰진다)
+            log.warning("history_store: %s 조회 실패: %s", table, e)
+            return empty
+
+    def keyword_trend(self, keyword: str, months, region: str = None) -> pd.DataFrame:
+        """월별 키워드 순위/검색량. 저장된 달에 없으면 순위는 비워 둔다 (검색어에 국가 구분이 없으면 ALL 행을 쓴다)."""
+        regions = None if region is None else [region, ALL]
+        df = self._scan("search", ["rank", "search_volume"], months, regions, where=ds.field("keyword") == keyword)
+        out = df.groupby("month").agg(rank=("rank", "min"), search_volume=("search_volume", "sum"))
+        out["rank"] = out["rank"].where(out["rank"] < 999)
+        out = out.reindex(list(months))
+        out.index.name = "month"
+        return out.reset_index()
+
+    def top_keywords(self, months, region: str = None, n: int = 20) -> list:
+        """여러 달에 걸쳐 자주, 높은 순위로 나온 키워드 (선택 목록용)."""
+        regions = None if region is None else [region, ALL]
+        df = self._scan("search", ["keyword", "rank"], months, regions)
+        df = df[df["rank"] < 999]
+        if df.empty:
+            return []
+        agg = df.groupby("keyword").agg(n_months=("month", "nunique"), best=("rank", "mean"))
+        return agg.sort_values(["n_months", "best"], ascending=[False, True]).head(n).index.tolist()
+
+    def month_summary(self, months, region: str) -> pd.DataFrame:
+        """국가의 월별 연휴 수 / 최고 점수 추천 상품."""
+        cal = self._scan("calendar", ["date", "name"], months, [region])
+        # calendar 에는 1년치가 오므로 그 달 날짜만 센다 (date 가 월 번호인 경우도 있음)
+        num = pd.to_numeric(cal["date"], errors="coerce")
+        cal_mm = num.where(num.notna(), pd.to_datetime(cal["date"], errors="coerce").dt.month)
+        cal = cal[cal_mm == month_numbers(cal["month"])]
+        rec = self._scan("recommended", ["name", "score"], months, [region]).dropna(subset=["score"])
+        best = rec.loc[rec.groupby("month")["score"].idxmax()].set_index("month") if not rec.empty else rec.set_index("month")
+        out = pd.DataFrame(index=pd.Index(list(months), name="month"))
+        out["holidays"] = cal.groupby("month")["name"].nunique().reindex(out.index).fillna(0).astype(int)
+        out["top_item"] = best["name"].reindex(out.index)
+        out["top_score"] = best["score"].reindex(out.index)
+        stored = set(self.months())
+        out["stored"] = [m in stored for m in out.index]
+        return out.reset_index()
@@ -0,0 +1,130 @@
+# http_pool.py
+# n8n 호출용 프로세스 공용 requests.Session.
+# 요청마다 Session/Adapter 를 새로 만들면 매번 TCP+TLS 핸드셰이크를 다시 하므로,
+# keep-alive 연결 풀을 한 번만 만들어 모든 사용자/리런/스레드가 공유한다.
+# request_deadline 안의 요청은 재시도/대기를 포함해 마감 시각까지만 쓴다 (시도마다 connect/read 제한을 남은 시간으로 줄임).
+import socket, threading, time
+from contextlib import contextmanager
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter, Retry
+from urllib3.connection import HTTPConnection
+from urllib3.util import Timeout
+
+
+_deadline = threading.local()
+_MIN_TIMEOUT = 0.01                                 # 0 은 소켓을 non-blocking 으로 만들므로 최소값
+
+
+@contextmanager
+def request_deadline(deadline):
+    """이 스레드의 요청을 deadline(time.monotonic() 기준)까지로 제한한다. None 이면 제한 없음."""
+    prev = getattr(_deadline, "at", None)
+    _deadline.at = deadline
+    try:
+        yield
+    finally:
+        _deadline.at = prev
+
+
+def time_left():
+    """request_deadline 안이면 마감까지 남은 초 (지났으면 0 이하), 아니면 None."""
+    at = getattr(_deadline, "at", None)
+    return None if at is None else at - time.monotonic()
+
+
+def _cap(value):
+    left = time_left()
+    if left is None:
+        return value
+    left = max(left, _MIN_TIMEOUT)
+    return left if value is None or value is Timeout.DEFAULT_TIMEOUT else min(value, left)
+
+
+class DeadlineTimeout(Timeout):
+    """urllib3 는 시도(재시도 포함)마다 clone() 한 값을 쓰므로, 그때그때 남은 시간으로 connect/read 를 줄인다."""
+
+    def clone(self):
+        return DeadlineTimeout(connect=self._connect, read=self._read, total=self.total)
+
+    @property
+    def connect_timeout(self):
+        return _cap(super().connect_timeout)
+
+    @property
+    def read_timeout(self):
+        return _cap(super().read_timeout)
+
+
+class DeadlineRetry(Retry):
+    """마감이 있으면 지난 뒤에는 재시도하지 않고, 재시도 전 대기(Retry-After 포함)도 남은 시간까지만."""
+
+    def is_exhausted(self) -> bool:
+        left = time_left()
+        return super().is_exhausted() or (left is not None and left <= 0)
+
+    def sleep(self, response=None) -> None:
+        left = time_left()
+        if left is None:
+            return super().sleep(response)
+        wait = self.get_retry_after(response) if response is not None and self.respect_retry_after_header else None
+        time.sleep(max(0.0, min(self.get_backoff_time() if wait is None else wait, left)))
+
+
+def _keepalive_socket_options(idle_sec: int):
+    opts = list(HTTPConnection.default_socket_options) + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    # TCP_KEEP* 는 플랫폼별로 없을 수 있음
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        opts.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, idle_sec))
+    if hasattr(socket, "TCP_KEEPINTVL"):
+        opts.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, max(1, idle_sec // 4)))
+    return opts
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    def __init__(self, keepalive_idle: int = 60, **kwargs):
+        self._socket_options = _keepalive_socket_options(keepalive_idle)
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = self._socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+
+def build_session(pool_connections: int = 4, pool_maxsize: int = 16, keepalive_idle: int = 60,
+                  retry_total: int = 2, retry_backoff: float = 0.8) -> requests.Session:
+    sess = requests.Session()
+    # 여러 스레드가 같은 세션을 쓰므로 쿠키 저장을 막아 공유 상태 변경을 없앤다
+    sess.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    retry = DeadlineRetry(
+        total=retry_total, connect=retry_total, read=retry_total, backoff_factor=retry_backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=["POST"]
+    )
+    adapter = KeepAliveAdapter(
+        keepalive_idle=keepalive_idle, max_retries=retry,
+        pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+    )
+    sess.mount("https://", adapter); sess.mount("http://", adapter)
+    return sess
+
+
+def pool_stats(sess: requests.Session) -> dict:
+    """연결 풀 누적 통계. connections 가 requests 보다 작을수록 keep-alive 재사용이 잘 되는 것."""
+    out = {"pools": 0, "requests": 0, "connections": 0}
+    seen = set()
+    for adapter in sess.adapters.values():
+        if id(adapter) in seen:
+            continue
+        seen.add(id(adapter))
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            out["pools"] += 1
+            out["requests"] += pool.num_requests
+            out["connections"] += pool.num_connections
+    out["reused"] = max(0, out["requests"] - out["connections"])
+    return out
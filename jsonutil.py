@@ -0,0 +1,246 @@
+# jsonutil.py
+# 큰 n8n 응답을 필요한 키만 골라 점진적으로 파싱.
+# 응답 본문을 청크 단위로 읽으면서 필요 없는 값은 객체를 만들지 않고 건너뛰고(버퍼에서도 바로 버림),
+# 필요한 키의 값만 json.loads 한다. 최대 메모리는 "n8n 이 보낸 양"이 아니라 "실제로 쓰는 양"을 따라간다.
+# loads/dumps 는 orjson 이 있으면 그것을, 없거나 처리 못 하는 값이면 표준 json 을 쓴다.
+import json, re
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:                                 # 선택 의존성
+    orjson = None
+
+_WS = re.compile(rb"[ \t\n\r]*")
+_STR_BODY = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*')      # 닫는 따옴표 전까지(이스케이프 포함)
+_SCALAR = re.compile(rb"[^,\]}\s]*")
+_RUN = re.compile(rb'(?:[^"\[\]{}]+|"[^"\\]*(?:\\.[^"\\]*)*")*')  # 다음 괄호까지의 스칼라/완결된 문자열
+_KEY = re.compile(rb'"([^"\\]*)"[ \t\n\r]*:')                     # 이스케이프 없는 키 빠른 경로
+_BOM = b"\xef\xbb\xbf"
+
+
+def loads(s):
+    """bytes/bytearray/str → 파이썬 값. orjson 이 거부하는 입력(NaN, 64bit 초과 정수 등)은 표준 json 으로 다시 시도."""
+    if orjson is not None:
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(s)
+
+
+def dumps_bytes(obj, indent: bool = False) -> bytes:
+    """UTF-8 JSON (ensure_ascii=False 와 같은 출력). indent=True 면 2칸 들여쓰기."""
+    if orjson is not None:
+        opt = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            return orjson.dumps(obj, option=opt, default=str)
+        except TypeError:                           # 64bit 초과 정수 등
+            pass
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None, default=str).encode("utf-8")
+
+
+def dumps(obj, indent: bool = False) -> str:
+    return dumps_bytes(obj, indent).decode("utf-8")
+
+
+def _scan_container(arr, depth: int, in_str: bool, bs_run: int):
+    """배열/객체 건너뛰기를 청크 단위로 벡터화.
+    arr 안에서 깊이가 0 으로 돌아오는 위치(없으면 -1)와, 다음 청크로 넘길 (depth, in_str, bs_run) 을 반환."""
+    n = len(arr)
+    q = arr == 34                                   # "
+    bs = arr == 92                                  # \
+    if bs_run or bs.any():
+        # 앞선 연속 백슬래시 개수가 홀수면 이스케이프된 따옴표
+        idx = np.arange(n)
+        last_non = np.maximum.accumulate(np.where(bs, -1, idx))
+        run = np.empty(n, dtype=np.int64)
+        run[0] = bs_run
+        run[1:] = idx[:-1] - last_non[:-1] + np.where(last_non[:-1] < 0, bs_run, 0)
+        q &= (run % 2) == 0
+        bs_run = int(n - 1 - last_non[-1] + (bs_run if last_non[-1] < 0 else 0))
+    qc = np.cumsum(q)
+    inside = ((qc - q + in_str) % 2) == 1           # 문자열 내부(따옴표 자체 제외)
+    delta = ((arr == 91) | (arr == 123)).astype(np.int8) - ((arr == 93) | (arr == 125))
+    delta[inside | q] = 0
+    d = depth + np.cumsum(delta)
+    hit = np.flatnonzero(d == 0)
+    if hit.size:
+        return int(hit[0]), 0, False, 0
+    return -1, int(d[-1]), bool((int(qc[-1]) + in_str) % 2), bs_run
+
+
+class _Reader:
+    def __init__(self, chunks):
+        self._it = iter(chunks)
+        self.buf = bytearray()
+        self.pos = 0
+        self.pin = None          # 유지해야 하는 값의 시작 위치 (None 이면 pos 이전은 버려도 됨)
+        self.eof = False
+
+    def more(self) -> bool:
+        """다음 청크를 붙인다. 이미 지나간 부분(고정된 값 제외)은 버퍼에서 잘라낸다."""
+        for chunk in self._it:
+            if not chunk:
+                continue
+            cut = self.pos if self.pin is None else self.pin
+            if cut:
+                del self.buf[:cut]
+                self.pos -= cut
+                if self.pin is not None:
+                    self.pin -= cut
+            self.buf += chunk
+            return True
+        self.eof = True
+        return False
+
+    def peek(self) -> bytes:
+        """공백을 건너뛴 다음 1바이트 (EOF 면 b"")."""
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos:self.pos + 1]
+            if not self.more():
+                return b""
+
+    def expect(self, ch: bytes) -> None:
+        if self.peek() != ch:
+            raise ValueError(f"expected {ch!r} at byte {self.pos}")
+        self.pos += 1
+
+    def skip_value(self) -> None:
+        """현재 위치의 JSON 값 하나를 객체 생성 없이 건너뛴다."""
+        c = self.peek()
+        if not c:
+            raise ValueError("unexpected end of JSON")
+        if c not in b'"[{':
+            while True:
+                self.pos = _SCALAR.match(self.buf, self.pos).end()
+                if self.pos < len(self.buf) or not self.more():
+                    return
+        if c == b'"':
+            self.pos += 1
+            while True:
+                self.pos = _STR_BODY.match(self.buf, self.pos).end()
+                if self.pos < len(self.buf) and self.buf[self.pos] == 34:
+                    self.pos += 1
+                    return
+                if not self.more():
+                    raise ValueError("unterminated JSON string")
+        # 작은 값은 정규식으로 괄호 단위 처리(대부분 여기서 끝남)
+        depth = 0
+        for _ in range(64):
+            self.pos = _RUN.match(self.buf, self.pos).end()
+            if self.pos >= len(self.buf) or self.buf[self.pos] == 34:   # 버퍼 끝 또는 잘린 문자열
+                break
+            ch = self.buf[self.pos]
+            self.pos += 1
+            if ch in (91, 123):
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
+        # 큰 값은 numpy 로 청크 단위 스캔
+        in_str, bs_run = False, 0
+        window = 4096                               # 작은 값은 작게, 큰 값은 점점 넓게 스캔
+        while True:
+            if self.pos >= len(self.buf) and not self.more():
+                raise ValueError("unterminated JSON value")
+            # bytearray 를 numpy 로 바로 보면 버퍼 크기 변경이 막히므로 구간을 복사해서 스캔
+            seg = bytes(self.buf[self.pos:self.pos + window])
+            end, depth, in_str, bs_run = _scan_container(np.frombuffer(seg, dtype=np.uint8), depth, in_str, bs_run)
+            if end >= 0:
+                self.pos += end + 1
+                return
+            self.pos += len(seg)
+            window = min(window * 4, 1 << 20)
+
+    def read_value(self, loads):
+        """현재 위치의 JSON 값 하나를 디코딩해 반환."""
+        self.peek()
+        self.pin = self.pos
+        try:
+            self.skip_value()
+            return loads(self.buf[self.pin:self.pos])
+        finally:
+            self.pin = None
+
+
+def _select_object(rd, keys, wrapper, loads) -> dict:
+    out = {}
+    rd.expect(b"{")
+    if rd.peek() == b"}":
+        rd.pos += 1
+        return out
+    while True:
+        if rd.peek() != b'"':
+            raise ValueError(f"expected object key at byte {rd.pos}")
+        m = _KEY.match(rd.buf, rd.pos)
+        if m is not None:
+            key = m.group(1).decode("utf-8")
+            rd.pos = m.end()
+        else:
+            key = rd.read_value(loads)
+            rd.expect(b":")
+        if wrapper is not None and key == wrapper and rd.peek() == b"{":
+            out[key] = _select_object(rd, keys, None, loads)
+        elif key in keys or key == wrapper:
+            out[key] = rd.read_value(loads)
+        else:
+            rd.skip_value()
+        c = rd.peek()
+        rd.pos += 1
+        if c == b",":
+            continue
+        if c == b"}":
+            return out
+        raise ValueError(f"expected ',' or '}}' at byte {rd.pos - 1}")
+
+
+def load_selected(chunks, keys, wrapper: str = "json", encoding: str = "utf-8", loads=loads):
+    """청크 iterable 에서 JSON 을 읽되 keys 에 해당하는 값만 디코딩한다.
+
+    - 최상위 객체: keys 만 남긴 dict
+    - 최상위 배열: 원소(dict)마다 keys 와 wrapper(예: n8n 의 {"json": {...}}) 안의 keys 만 남긴 list
+    - 그 외(문자열/코드펜스 텍스트 등): 전체를 기존처럼 json 또는 텍스트로 반환
+    """
+    keys = frozenset(keys)
+    rd = _Reader(chunks)
+    first = rd.peek()
+    if rd.buf.startswith(_BOM, rd.pos):
+        rd.pos += len(_BOM)
+        first = rd.peek()
+    if first not in (b"{", b"["):
+        while rd.more():
+            pass
+        body = rd.buf[rd.pos:]
+        try:
+            return loads(body)
+        except Exception:
+            return body.decode(encoding or "utf-8", errors="replace")
+    if first == b"{":
+        out = _select_object(rd, keys, None, loads)
+    else:
+        out = []
+        rd.pos += 1
+        if rd.peek() == b"]":
+            rd.pos += 1
+        else:
+            while True:
+                if rd.peek() == b"{":
+                    out.append(_select_object(rd, keys, wrapper, loads))
+                else:
+                    rd.skip_value()
+                c = rd.peek()
+                rd.pos += 1
+                if c == b",":
+                    continue
+                if c == b"]":
+                    break
+                raise ValueError(f"expected ',' or ']' at byte {rd.pos - 1}")
+    # 나머지를 끝까지 소비해야 keep-alive 연결이 풀로 돌아간다
+    if rd.peek():
+        raise ValueError(f"trailing data at byte {rd.pos}")
+    return out
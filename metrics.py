@@ -0,0 +1,130 @@
+# metrics.py
+# 단계별 소요 시간 + 카운터 (프로세스 공용).
+# 느린 화면이 네트워크/JSON 디코딩/정규화/검색어 Top N/테마 매칭/렌더링 중 어디서 오는지 보기 위한 것.
+# - 디버그 패널: snapshot()
+# - 모니터링: render_text() (Prometheus 텍스트 형식) 를 serve_metrics() 로 노출
+# - 구조화 로그: enable_json_log() 후 단계가 끝날 때마다 JSON 한 줄
+import json, logging, sys, threading, time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+log = logging.getLogger(__name__)
+
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(key: tuple) -> str:
+    if not key:
+        return ""
+    esc = lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in key) + "}"
+
+
+class Metrics:
+    def __init__(self, prefix: str = "n8n"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._stages = {}       # stage → [count, sum, max, last] (초)
+        self._counters = {}     # (name, labels) → 누적값
+        self._gauges = {}       # (name, labels) → 마지막 값
+        self.log_json = False
+
+    # ---- 기록 ----
+    @contextmanager
+    def timer(self, stage: str, **fields):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - t0, **fields)
+
+    def record(self, stage: str, seconds: float, **fields) -> None:
+        with self._lock:
+            s = self._stages.get(stage)
+            if s is None:
+                s = self._stages[stage] = [0, 0.0, 0.0, 0.0]
+            s[0] += 1
+            s[1] += seconds
+            s[2] = max(s[2], seconds)
+            s[3] = seconds
+        if self.log_json:
+            log.info(json.dumps({"event": "stage", "stage": stage, "ms": round(seconds * 1000, 2), **fields},
+                                ensure_ascii=False, default=str))
+
+    def inc(self, name: str, n: float = 1, **labels) -> None:
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def set(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._gauges[(name, _labels_key(labels))] = value
+
+    # ---- 조회/내보내기 ----
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "stages": {k: {"count": v[0], "sum": v[1], "max": v[2], "last": v[3]} for k, v in self._stages.items()},
+                "counters": {(n, l): v for (n, l), v in self._counters.items()},
+                "gauges": {(n, l): v for (n, l), v in self._gauges.items()},
+            }
+
+    def render_text(self) -> str:
+        snap = self.snapshot()
+        p = self.prefix
+        out = [f"# TYPE {p}_stage_seconds summary"]
+        for stage, s in sorted(snap["stages"].items()):
+            lbl = _fmt_labels((("stage", stage),))
+            out.append(f"{p}_stage_seconds_count{lbl} {s['count']}")
+            out.append(f"{p}_stage_seconds_sum{lbl} {s['sum']:.6f}")
+        out.append(f"# TYPE {p}_stage_seconds_max gauge")
+        for stage, s in sorted(snap["stages"].items()):
+            out.append(f"{p}_stage_seconds_max{_fmt_labels((('stage', stage),))} {s['max']:.6f}")
+        for kind, items in (("counter", snap["counters"]), ("gauge", snap["gauges"])):
+            typed = set()
+            for (name, lbl), v in sorted(items.items()):
+                metric = f"{p}_{name}_total" if kind == "counter" else f"{p}_{name}"
+                if metric not in typed:
+                    out.append(f"# TYPE {metric} {kind}")
+                    typed.add(metric)
+                out.append(f"{metric}{_fmt_labels(lbl)} {v}")
+        return "\n".join(out) + "\n"
+
+    def enable_json_log(self, level: int = logging.INFO) -> None:
+        """단계 기록을 JSON 한 줄 로그로 (핸들러가 없으면 stderr 로)."""
+        self.log_json = True
+        if not log.handlers:
+            h = logging.StreamHandler(sys.stderr)
+            h.setFormatter(logging.Formatter("%(message)s"))
+            log.addHandler(h)
+            log.propagate = False
+        log.setLevel(level)
+
+
+def serve_metrics(metrics: Metrics, port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """GET /metrics 로 render_text() 를 돌려주는 데몬 HTTP 서버."""
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = metrics.render_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    srv = ThreadingHTTPServer((host, port), _Handler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, name="metrics-http", daemon=True).start()
+    return srv
+
+
+# 프로세스 공용 (스트림릿 리런마다 다시 import 되지 않는 모듈이므로 한 번만 만들어진다)
+METRICS = Metrics()
@@ -0,0 +1,112 @@
+# n8n_client.py
+# n8n webhook 호출 → 스트리밍 선택 디코딩 → Payload.
+# 스트림릿에 의존하지 않으므로 앱(call_n8n)과 benchmarks/ 가 같은 경로를 쓴다.
+#
+# 조건부 재검증: 이전 payload(prev)가 있으면 If-None-Match 로 그 버전(content_hash)을 보낸다.
+# - 304: 다시 받지도 정규화하지도 않고 prev 를 그대로 돌려준다
+# - 200 + X-Delta-Base: <prev 버전>: 바뀐 최상위 키만 온 델타 → prev 에 덮어쓴다
+#   (ETag 가 없거나 기준이 prev 와 다르면 조건 없이 전체를 한 번 다시 받고, 그래도 델타면 ValueError)
+# - 200: 전체 본문. 버전은 ETag 가 있으면 ETag, 없으면 본문 sha1
+import hashlib, time
+
+from http_pool import DeadlineTimeout, request_deadline, time_left
+from jsonutil import dumps_bytes, load_selected
+from metrics import METRICS
+from payload_model import PAYLOAD_KEYS, apply_delta, normalize_payload
+
+STREAM_CHUNK_BYTES = 64 * 1024                                              # 응답 본문 읽기 단위
+
+
+def request_body(month_ym: str) -> dict:
+    return {
+        "content": f"{month_ym} 프로모션 추천",
+        "month": month_ym,
+        "year": month_ym.split("-")[0],
+        "chat_history": []
+    }
+
+
+def _etag(value) -> str:
+    # W/"abc" / "abc" / abc → abc
+    v = (value or "").strip()
+    if v.startswith("W/"):
+        v = v[2:]
+    return v.strip('"')
+
+
+def fetch_payload(sess, webhook: str, month_ym: str, chunk_bytes: int = STREAM_CHUNK_BYTES, timeout=(5, 120),
+                  prev=None, deadline=None):
+    """deadline(time.monotonic() 기준)이 있으면 재시도 대기와 본문 수신까지 그 시각 안에서 끝낸다 (넘기면 예외)."""
+    if deadline is not None:
+        timeout = DeadlineTimeout(connect=timeout[0], read=timeout[1])
+    with request_deadline(deadline):
+        return _fetch_payload(sess, webhook, month_ym, chunk_bytes, timeout, prev)
+
+
+def _fetch_payload(sess, webhook: str, month_ym: str, chunk_bytes: int, timeout, prev, refetched: bool = False):
+    headers = {"Content-Type": "application/json"}
+    if prev is not None and prev.content_hash:
+        headers["If-None-Match"] = f'"{prev.content_hash}"'
+    with METRICS.timer("n8n_request", month=month_ym):        # 응답 헤더까지 (n8n 워크플로 실행 시간 포함)
+        r = sess.post(webhook, data=dumps_bytes(request_body(month_ym)), timeout=timeout, stream=True,
+                      headers=headers)
+    if r.status_code == 304 and "If-None-Match" in headers:
+        r.close()
+        METRICS.inc("revalidations", result="not_modified")
+        return prev
+    h = hashlib.sha1()
+    net = [0.0, 0]                                               # 본문 수신 대기 시간, 바이트 수
+
+    def _chunks(it):
+        while True:
+            t0 = time.perf_counter()
+            c = next(it, None)
+            net[0] += time.perf_counter() - t0
+            if c is None:
+                return
+            left = time_left()
+            if left is not None and left <= 0:
+                raise TimeoutError(f"{month_ym} 응답 본문을 마감 시간 안에 다 받지 못했습니다")
+            net[1] += len(c)
+            h.update(c)
+            yield c
+
+    with r:
+        r.raise_for_status()
+        # 본문 전체를 트리로 만들지 않고 청크를 읽으며 PAYLOAD_KEYS 만 골라 디코딩 (해시는 읽으면서 계산)
+        t0 = time.perf_counter()
+        try:
+            parsed = load_selected(_chunks(r.iter_content(chunk_size=chunk_bytes)), PAYLOAD_KEYS, encoding=r.encoding)
+        except ValueError:
+            parsed = {}
+        # 수신과 디코딩이 번갈아 일어나므로, 전체 시간에서 수신 대기 시간을 빼서 디코딩 시간으로 본다
+        METRICS.record("n8n_download", net[0], month=month_ym, bytes=net[1])
+        METRICS.record("json_decode", time.perf_counter() - t0 - net[0], month=month_ym)
+        wire = r.raw.tell() if hasattr(r.raw, "tell") else net[1]     # 압축된 채로 받은 바이트
+        encoding = r.headers.get("Content-Encoding") or "identity"
+        etag = _etag(r.headers.get("ETag"))
+        version = etag or h.hexdigest()
+        delta_base = _etag(r.headers.get("X-Delta-Base"))
+    if delta_base and (not etag or prev is None or delta_base != prev.content_hash):
+        # 쓸 수 없는 델타: ETag 가 없으면 합친 결과의 버전을 알 수 없고(다음 If-None-Match 에 못 씀),
+        # 기준이 prev 와 다르면 덮어쓸 대상이 없다. 조건 없이 전체를 한 번만 다시 받는다
+        if refetched:
+            raise ValueError(f"조건 없는 요청에 델타 응답이 왔습니다 (X-Delta-Base: {delta_base})")
+        METRICS.inc("revalidations", result="delta_unusable")
+        return _fetch_payload(sess, webhook, month_ym, chunk_bytes, timeout, None, refetched=True)
+    METRICS.inc("response_bytes", net[1])
+    METRICS.inc("response_wire_bytes", wire, encoding=encoding)
+    METRICS.set("last_response_bytes", net[1])
+    METRICS.set("last_response_wire_bytes", wire)
+    if prev is not None:
+        METRICS.inc("revalidations", result="delta" if delta_base else "full")
+    with METRICS.timer("normalize", month=month_ym):
+        if delta_base:
+            data = apply_delta(prev, parsed, version)
+        else:
+            data = normalize_payload(parsed, content_hash=version)
+    METRICS.set("last_items", len(data.search_data), kind="search")
+    METRICS.set("last_items", len(data.catalog_raw), kind="catalog")
+    METRICS.set("last_items", len(data.calendar), kind="calendar")
+    METRICS.set("last_items", sum(len(v) for v in data.rec_by_region.values()), kind="recommended")
+    return data
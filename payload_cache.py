@@ -0,0 +1,194 @@
+# payload_cache.py
+# n8n 정규화 payload 를 디스크(SQLite)에 보관하는 영속 캐시 계층.
+# - (webhook, month) 단위로 저장, 재배포/재시작 후에도 유지
+# - 전체 크기가 max_bytes 를 넘으면 가장 오래 안 쓰인 항목부터 제거
+# - ttl 이 지난 항목은 즉시 돌려주고 백그라운드에서 재검증(stale-while-revalidate)
+# - 같은 (webhook, month) 의 동시 갱신은 한 번의 loader 호출로 합친다(single-flight)
+# - loader(webhook, month, prev) 에 기존 값을 넘겨 조건부 재검증. prev 를 그대로 돌려주면(변경 없음) 시각만 갱신
+import logging, os, sqlite3, threading, time, zlib
+
+from jsonutil import dumps_bytes, loads
+from metrics import METRICS
+from single_flight import SingleFlight
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS payload_cache (
+    webhook     TEXT NOT NULL,
+    month       TEXT NOT NULL,
+    body        BLOB NOT NULL,
+    size        INTEGER NOT NULL,
+    fetched_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (webhook, month)
+)
+"""
+
+
+class PersistentCache:
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, ttl: float = 600,
+                 encode=None, decode=None):
+        self.path = path
+        self.encode = encode or (lambda x: x)    # payload → JSON 직렬화 가능한 값
+        self.decode = decode or (lambda x: x)
+        self.max_bytes = int(max_bytes)
+        self.ttl = float(ttl)
+        self._lock = threading.Lock()
+        self._revalidating = set()
+        self._failing = set()       # 마지막 갱신이 실패한 (webhook, month): 만료된 값을 계속 내주는 중
+        self._flight = SingleFlight()
+        d = os.path.dirname(os.path.abspath(path))
+        os.makedirs(d, exist_ok=True)
+        with self._connect() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute(_SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    # ---- 저장/조회 ----
+    def get(self, webhook: str, month: str):
+        """(payload, fetched_at) 또는 None. 조회 시 LRU 시각을 갱신한다."""
+        with self._lock, self._connect() as con:
+            row = con.execute(
+                "SELECT body, fetched_at FROM payload_cache WHERE webhook=? AND month=?",
+                (webhook, month),
+            ).fetchone()
+            if row is None:
+                return None
+            con.execute(
+                "UPDATE payload_cache SET accessed_at=? WHERE webhook=? AND month=?",
+                (time.time(), webhook, month),
+            )
+        try:
+            return self.decode(loads(zlib.decompress(row[0]))), row[1]
+        except Exception:
+            log.warning("payload_cache: 손상된 항목 무시 (%s, %s)", webhook, month)
+            return None
+
+    def contains(self, webhook: str, month: str) -> bool:
+        """만료 여부와 상관없이 항목이 있는지 (본문은 읽지 않음)."""
+        with self._lock, self._connect() as con:
+            return con.execute(
+                "SELECT 1 FROM payload_cache WHERE webhook=? AND month=?", (webhook, month),
+            ).fetchone() is not None
+
+    def is_fresh(self, webhook: str, month: str) -> bool:
+        with self._lock, self._connect() as con:
+            row = con.execute(
+                "SELECT fetched_at FROM payload_cache WHERE webhook=? AND month=?",
+                (webhook, month),
+            ).fetchone()
+        return row is not None and time.time() - row[0] < self.ttl
+
+    def put(self, webhook: str, month: str, payload) -> None:
+        body = zlib.compress(dumps_bytes(self.encode(payload)), 3)
+        if len(body) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock, self._connect() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO payload_cache VALUES (?,?,?,?,?,?)",
+                (webhook, month, body, len(body), now, now),
+            )
+            self._evict(con)
+
+    def touch(self, webhook: str, month: str) -> None:
+        """내용은 그대로 두고 받은 시각만 갱신 (재검증 결과 변경 없음)."""
+        now = time.time()
+        with self._lock, self._connect() as con:
+            con.execute(
+                "UPDATE payload_cache SET fetched_at=?, accessed_at=? WHERE webhook=? AND month=?",
+                (now, now, webhook, month),
+            )
+
+    def _evict(self, con) -> None:
+        total = con.execute("SELECT COALESCE(SUM(size), 0) FROM payload_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = con.execute(
+            "SELECT webhook, month, size FROM payload_cache ORDER BY accessed_at ASC"
+        ).fetchall()
+        for webhook, month, size in rows:
+            if total <= self.max_bytes:
+                break
+            con.execute("DELETE FROM payload_cache WHERE webhook=? AND month=?", (webhook, month))
+            total -= size
+
+    # ---- stale-while-revalidate ----
+    def fetch(self, webhook: str, month: str, loader, with_freshness: bool = False):
+        """캐시 우선 조회. 없으면 loader(webhook, month, prev) 로 채우고,
+        ttl 이 지났으면 기존 값을 즉시 반환한 뒤 백그라운드에서 갱신한다.
+        with_freshness 면 (payload, fresh) 를 돌려준다. fresh=False 는 만료된 값이라 위 계층이 새 값처럼 다시 캐시하면 안 된다."""
+        with METRICS.timer("disk_cache_get", month=month):
+            hit = self.get(webhook, month)
+        if hit is None:
+            METRICS.inc("cache_lookups", layer="disk", result="miss")
+            payload, fresh = self.refresh(webhook, month, loader), True
+        else:
+            payload, fetched_at = hit
+            fresh = time.time() - fetched_at < self.ttl
+            if fresh:
+                METRICS.inc("cache_lookups", layer="disk", result="hit")
+            else:
+                METRICS.inc("cache_lookups", layer="disk", result="stale")
+                self.revalidate_async(webhook, month, loader, payload)
+        return (payload, fresh) if with_freshness else payload
+
+    def refresh(self, webhook: str, month: str, loader, prev=None):
+        # 사용자 요청/재검증/선조회가 같은 월을 동시에 부르면 먼저 시작한 호출 결과를 같이 쓴다
+        return self._flight.do((webhook, month), self._load, webhook, month, loader, prev)
+
+    def _load(self, webhook: str, month: str, loader, prev=None):
+        if prev is None:
+            hit = self.get(webhook, month)      # 만료된 값이라도 있으면 그 버전으로 재검증
+            prev = hit[0] if hit else None
+        try:
+            payload = loader(webhook, month, prev)
+        except Exception:
+            with self._lock:
+                self._failing.add((webhook, month))
+            raise
+        if prev is not None and payload is prev:
+            self.touch(webhook, month)
+        else:
+            self.put(webhook, month, payload)
+        with self._lock:
+            self._failing.discard((webhook, month))
+        return payload
+
+    def is_failing(self, webhook: str, month: str) -> bool:
+        """마지막 갱신 시도가 실패했는지 (성공하면 해제)."""
+        with self._lock:
+            return (webhook, month) in self._failing
+
+    def is_loading(self, webhook: str, month: str) -> bool:
+        return self._flight.inflight((webhook, month))
+
+    def pending(self, webhook: str, month: str):
+        """진행 중인 갱신의 Future (없으면 None). 결과는 loader 가 돌려준 payload."""
+        return self._flight.pending((webhook, month))
+
+    @property
+    def coalesced(self) -> int:
+        """single-flight 로 합쳐져 생략된 loader 호출 수 (누적)."""
+        return self._flight.coalesced
+
+    def revalidate_async(self, webhook: str, month: str, loader, prev=None) -> None:
+        key = (webhook, month)
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        def _run():
+            try:
+                self.refresh(webhook, month, loader, prev)
+            except Exception as e:
+                log.warning("payload_cache: 재검증 실패 (%s, %s): %s", webhook, month, e)
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+
+        threading.Thread(target=_run, name=f"revalidate-{month}", daemon=True).start()
@@ -0,0 +1,249 @@
+# payload_model.py
+# n8n 응답 정규화 + 가벼운 불변 모델.
+# 스트림릿은 매 리런마다 streamlit_app.py 를 다시 실행하므로, 캐시/스레드 간에 오가는 클래스는
+# 여기(한 번만 import 되는 모듈)에 두어야 클래스 정체성이 유지되고 pickle 도 안전하다.
+import hashlib, json, re
+from dataclasses import dataclass, field, replace
+
+from jsonutil import loads
+from payload_views import build_holiday_index
+
+# normalize_payload 가 실제로 읽는 키. 응답 본문은 이 키들만 디코딩한다.
+PAYLOAD_KEYS = (
+    "reply", "ats", "search_data", "search_data_raw", "calendar", "calendar_raw",
+    "catalog_raw", "recommended_products_by_region", "restock_alerts", "promotions_by_region",
+)
+
+_REC_FIELDS = ("sku", "name", "category", "stock", "suggested_mechanic")
+_FENCE_OPEN = re.compile(r"```(?:json)?\s*", re.I)
+
+
+def _as_dict(obj):
+    if isinstance(obj, dict):
+        return obj
+    if isinstance(obj, str):
+        s = obj.strip()
+        # JSON 으로 시작할 때만 통째로 파싱을 시도 (코드펜스 텍스트를 먼저 실패시키는 비용을 줄임)
+        if s[:1] in ("{", "[", '"'):
+            try:
+                return _as_dict(loads(s))
+            except Exception:
+                pass
+        # 여는 펜스만 정규식으로 찾고 닫는 펜스는 str.find (큰 본문에서 지연 매칭 정규식보다 훨씬 빠름)
+        m = _FENCE_OPEN.search(s)
+        end = s.find("```", m.end()) if m else -1
+        if end >= 0:
+            try:
+                return _as_dict(loads(s[m.end():end].strip()))
+            except Exception:
+                pass
+        return {}
+    if isinstance(obj, list):
+        out = {}
+        for it in obj:
+            d = it.get("json", it) if isinstance(it, dict) else {}
+            for k in [
+                "reply","search_data","calendar","promotions",
+                "search_data_raw","calendar_raw","catalog_raw",
+                "recommended_products_by_region","restock_alerts"
+            ]:
+                if k in d and k not in out:
+                    out[k] = d[k]
+            if isinstance(d.get("ats"), dict):
+                out["ats"] = d["ats"]
+            if "promotions_by_region" in d:
+                out["promotions_by_region"] = d["promotions_by_region"]
+        return out
+    return {}
+
+
+def score_total(it):
+    sc = it.get("scores") or {}
+    v = sc.get("final", sc.get("total"))
+    try:
+        return float(v)
+    except Exception:
+        return None
+
+
+@dataclass(frozen=True, slots=True)
+class RecItem:
+    sku: object = None
+    name: object = None
+    category: object = None
+    stock: object = None
+    suggested_mechanic: object = None
+    score: float | None = None          # scores.final/total 을 fetch 시 한 번만 파싱 (원본 scores 는 extra 에 그대로)
+    extra: dict | None = None           # 위 필드 외의 원본 키 (scores 포함, 없으면 None)
+
+    @classmethod
+    def from_dict(cls, it: dict) -> "RecItem":
+        extra = {k: v for k, v in it.items() if k not in _REC_FIELDS}
+        return cls(
+            sku=it.get("sku"), name=it.get("name"), category=it.get("category"),
+            stock=it.get("stock"), suggested_mechanic=it.get("suggested_mechanic"),
+            score=score_total(it), extra=extra or None,
+        )
+
+    def to_dict(self) -> dict:
+        d = {k: getattr(self, k) for k in _REC_FIELDS if getattr(self, k) is not None}
+        if self.extra:
+            d.update(self.extra)
+        return d
+
+
+@dataclass(frozen=True, slots=True)
+class Payload:
+    reply: str = ""
+    month: str = ""                                     # ats.month
+    search_data: list = field(default_factory=list)
+    calendar: list = field(default_factory=list)
+    catalog_raw: list = field(default_factory=list)
+    restock_alerts: list = field(default_factory=list)
+    ats_regions: list = field(default_factory=list)
+    promotions_by_region: list = field(default_factory=list)
+    # fetch 당 한 번 만드는 국가별 인덱스 (조회 O(1))
+    regions: dict = field(default_factory=dict)         # region → ats 정보 dict
+    rec_by_region: dict = field(default_factory=dict)   # region → tuple[RecItem] (점수 내림차순)
+    promos_by_region: dict = field(default_factory=dict)  # region → 프로모션 item list
+    holidays: dict = field(default_factory=dict)        # (country, 월) → 연휴 이름 tuple
+    extra: dict = field(default_factory=dict)
+    content_hash: str = ""
+    # 장애/지연으로 새로 받지 못해 디스크의 마지막 값을 대신 쓰는 경우 (to_dict/캐시에는 저장하지 않음)
+    stale: bool = False
+    fetched_at: float = 0.0                             # stale 일 때 그 값을 받은 시각 (epoch 초)
+
+    def region_info(self, code: str) -> dict:
+        return self.regions.get(code) or {"region": code}
+
+    def rec_items(self, code: str) -> tuple:
+        return self.rec_by_region.get(code, ())
+
+    def promo_items(self, code: str) -> list:
+        return self.promos_by_region.get(code) or []
+
+    def holiday_names(self, country: str, month: int) -> tuple:
+        return self.holidays.get((country, month), ())
+
+    def is_empty(self) -> bool:
+        return not (self.content_hash or self.reply or self.search_data or self.calendar
+                    or self.regions or self.rec_by_region or self.promos_by_region)
+
+    def to_dict(self) -> dict:
+        """예전 정규화 dict 모양 (디스크 캐시/Raw JSON 용)."""
+        return {
+            "reply": self.reply,
+            "search_data": self.search_data,
+            "calendar": self.calendar,
+            "catalog_raw": self.catalog_raw,
+            "recommended_products_by_region": [
+                {"region": r, "items": [it.to_dict() for it in items]} for r, items in self.rec_by_region.items()
+            ],
+            "restock_alerts": self.restock_alerts,
+            "promotions_by_region": self.promotions_by_region,
+            "ats": {"month": self.month, "regions": self.ats_regions},
+            "_extra": self.extra,
+            "_hash": self.content_hash,
+        }
+
+
+EMPTY_PAYLOAD = Payload()
+
+
+def _region_index(blocks) -> dict:
+    # 같은 region 이 여러 번 오면 예전 선형 탐색처럼 첫 번째 것을 쓴다
+    out = {}
+    for b in blocks:
+        if isinstance(b, dict) and isinstance(b.get("region"), str):
+            out.setdefault(b["region"], b)
+    return out
+
+
+def normalize_payload(obj, content_hash: str = "") -> Payload:
+    d = _as_dict(obj)
+    ats = d.get("ats") or {}
+    if isinstance(ats, str):
+        try:
+            ats = loads(ats)
+        except Exception:
+            ats = {}
+    regions = ats.get("regions")
+    if isinstance(regions, dict):
+        regions = [{"region": k, **(v if isinstance(v, dict) else {})} for k, v in regions.items()]
+    if not isinstance(regions, list):
+        regions = []
+
+    calendar = d.get("calendar_raw")
+    if not isinstance(calendar, list):
+        calendar = d.get("calendar") if isinstance(d.get("calendar"), list) else []
+    search_data = d.get("search_data_raw")
+    if not isinstance(search_data, list):
+        search_data = d.get("search_data") if isinstance(d.get("search_data"), list) else []
+
+    catalog = d.get("catalog_raw") if isinstance(d.get("catalog_raw"), list) else []
+    rec_blocks = d.get("recommended_products_by_region") if isinstance(d.get("recommended_products_by_region"), list) else []
+    restock_alerts = d.get("restock_alerts") if isinstance(d.get("restock_alerts"), list) else []
+    promo_blocks = d.get("promotions_by_region") if isinstance(d.get("promotions_by_region"), list) else []
+
+    rec_by_region = {}
+    for region, b in _region_index(rec_blocks).items():
+        items = [RecItem.from_dict(it) for it in (b.get("items") or []) if isinstance(it, dict)]
+        items.sort(key=lambda x: (x.score or -1), reverse=True)
+        rec_by_region[region] = tuple(items)
+
+    return Payload(
+        reply=d.get("reply") or "",
+        month=ats.get("month") or "",
+        search_data=search_data,
+        calendar=calendar,
+        catalog_raw=catalog,
+        restock_alerts=restock_alerts,
+        ats_regions=regions,
+        promotions_by_region=promo_blocks,
+        regions=_region_index(regions),
+        rec_by_region=rec_by_region,
+        promos_by_region={r: (b.get("items") or []) for r, b in _region_index(promo_blocks).items()},
+        holidays=build_holiday_index(calendar),
+        # 원본 dict 를 통째로 다시 들고 있지 않고, 위에서 꺼내지 않은 키만 남긴다
+        extra={k: v for k, v in d.items() if k not in PAYLOAD_KEYS and k != "promotions"},
+        content_hash=content_hash,
+    )
+
+
+# 응답 최상위 키 → 그 키로 만들어지는 Payload 필드 (델타 응답은 바뀐 키만 보낸다)
+_DELTA_FIELDS = {
+    "reply": ("reply",),
+    "ats": ("month", "ats_regions", "regions"),
+    "search_data": ("search_data",),
+    "search_data_raw": ("search_data",),
+    "calendar": ("calendar", "holidays"),
+    "calendar_raw": ("calendar", "holidays"),
+    "catalog_raw": ("catalog_raw",),
+    "recommended_products_by_region": ("rec_by_region",),
+    "restock_alerts": ("restock_alerts",),
+    "promotions_by_region": ("promotions_by_region", "promos_by_region"),
+}
+
+
+def apply_delta(prev: Payload, delta, content_hash: str) -> Payload:
+    """prev 에 바뀐 최상위 키만 담긴 응답을 덮어쓴다. 보내지 않은 키는 prev 의 정규화 결과를 그대로 쓴다."""
+    d = _as_dict(delta)
+    part = normalize_payload(d)
+    fields = {f for k in d if k in _DELTA_FIELDS for f in _DELTA_FIELDS[k]}
+    return replace(prev, **{f: getattr(part, f) for f in fields}, content_hash=content_hash, stale=False, fetched_at=0.0)
+
+
+def payload_from_dict(d: dict) -> Payload:
+    """Payload.to_dict() (또는 예전 정규화 dict) 를 다시 모델로."""
+    if not isinstance(d, dict):
+        return EMPTY_PAYLOAD
+    p = normalize_payload({k: v for k, v in d.items() if k in PAYLOAD_KEYS}, content_hash=d.get("_hash") or "")
+    extra = d.get("_extra")
+    return replace(p, extra=extra) if isinstance(extra, dict) else p
+
+
+def payload_hash(data: Payload) -> str:
+    # 응답 본문 해시가 없으면(예: 예전 캐시 항목) 정규화 결과로 계산
+    if data.content_hash:
+        return data.content_hash
+    return hashlib.sha1(json.dumps(data.to_dict(), ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")).hexdigest()
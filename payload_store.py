@@ -0,0 +1,68 @@
+# payload_store.py
+# 프로세스 공용 payload 저장소. (webhook, month) 당 같은 내용의 payload 는 한 벌만 메모리에 둔다.
+# st.cache_data 는 호출마다 역직렬화한 사본을 돌려주므로 세션마다 그대로 들고 있으면 동시 사용자 수만큼 메모리가 는다.
+# 세션은 PayloadHandle 만 들고, 항목(payload + 파생 결과)은 어떤 핸들도 참조하지 않으면 약한 참조로 함께 사라진다.
+import threading, weakref
+
+
+class _Entry:
+    __slots__ = ("key", "payload", "memo", "lock", "__weakref__")
+
+    def __init__(self, key: tuple, payload):
+        self.key = key
+        self.payload = payload
+        self.memo = {}                  # 이름 → 파생 결과 (읽기 전용으로 취급)
+        self.lock = threading.Lock()
+
+
+class PayloadHandle:
+    """저장소 항목에 대한 읽기 전용 핸들. 세션 상태에는 이것만 둔다 (핸들이 살아 있는 동안 항목도 유지)."""
+    __slots__ = ("_entry",)
+
+    def __init__(self, entry: _Entry):
+        self._entry = entry
+
+    @property
+    def key(self) -> tuple:
+        return self._entry.key
+
+    @property
+    def payload(self):
+        return self._entry.payload
+
+    def memo(self, name, build):
+        """항목에 붙는 파생 결과. 같은 항목을 보는 세션끼리 한 번만 build() 한다."""
+        e = self._entry
+        with e.lock:
+            if name not in e.memo:
+                e.memo[name] = build()
+            return e.memo[name]
+
+
+def _same(a, b) -> bool:
+    # 응답 본문 해시가 같고 stale 여부가 같으면 같은 내용으로 본다 (해시가 없으면 같은 객체일 때만)
+    if a is b:
+        return True
+    return bool(a.content_hash) and a.content_hash == b.content_hash and a.stale == b.stale
+
+
+class PayloadStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = weakref.WeakValueDictionary()     # (webhook, month) → _Entry
+        self.deduped = 0
+
+    def intern(self, webhook: str, month: str, payload) -> PayloadHandle:
+        """payload 를 저장소에 넣고 핸들을 돌려준다. 같은 내용이 이미 있으면 그 항목을 공유하고 새 사본은 버린다."""
+        key = (webhook, month)
+        with self._lock:
+            e = self._entries.get(key)
+            if e is not None and _same(e.payload, payload):
+                self.deduped += 1
+            else:
+                e = self._entries[key] = _Entry(key, payload)
+            return PayloadHandle(e)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
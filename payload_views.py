@@ -0,0 +1,316 @@
+# payload_views.py
+# Payload 에서 화면용 표/목록을 만드는 함수들 (스트림릿 의존 없음).
+import heapq, re
+from collections import Counter
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from metrics import METRICS
+
+
+def _mm_any(x):
+    if x is None: return None
+    if isinstance(x, (int, float)):
+        mm = int(x);  return mm if 1 <= mm <= 12 else None
+    t = str(x).strip()
+    if not t: return None
+    m = re.search(r"20\d{2}[-/\.]?(\d{1,2})", t)
+    if m:
+        mm = int(m.group(1));  return mm if 1 <= mm <= 12 else None
+    m2 = re.fullmatch(r"(\d{1,2})", t)
+    if m2:
+        mm = int(m2.group(1));  return mm if 1 <= mm <= 12 else None
+    m3 = re.search(r"(\d{1,2})\s*월", t)
+    if m3:
+        mm = int(m3.group(1));  return mm if 1 <= mm <= 12 else None
+    return None
+
+
+def month_numbers(s: pd.Series) -> np.ndarray:
+    """월 표기(2025-12, 202512, 12, '12월', 12.0 ...)를 1~12 (해석 불가는 0) 배열로.
+    월 값의 종류는 보통 몇 개뿐이라 고유값에만 정규식을 돌리고 factorize 코드로 펼친다."""
+    try:
+        codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    except TypeError:                                   # list/dict 처럼 해시 불가한 값이 섞인 경우
+        return np.fromiter((_mm_any(x) or 0 for x in s), dtype=np.int16, count=len(s))
+    # 마지막 칸은 결측(-1 코드)용 0
+    table = np.fromiter((_mm_any(u) or 0 for u in uniques), dtype=np.int16, count=len(uniques))
+    return np.append(table, np.int16(0))[codes]
+
+
+def build_holiday_index(calendar) -> dict:
+    """calendar 행들을 (country, 월) → 연휴 이름 tuple 로 한 번에 색인.
+    date 가 숫자 컬럼이면 월 번호로, 아니면 날짜 문자열로 보고 월을 뽑는다 (기존 화면 로직과 동일)."""
+    if not calendar:
+        return {}
+    cal_df = pd.DataFrame(calendar)
+    if not {"date", "country", "name"} <= set(cal_df.columns):
+        return {}
+    if pd.api.types.is_numeric_dtype(cal_df["date"]):
+        try:
+            mm = cal_df["date"].astype("Int64")
+        except (TypeError, ValueError):
+            return {}
+    else:
+        mm = pd.to_datetime(cal_df["date"], errors="coerce").dt.month
+    sub = pd.DataFrame({"country": cal_df["country"], "mm": mm, "name": cal_df["name"]})
+    sub = sub.dropna(subset=["country", "mm", "name"])
+    sub["name"] = sub["name"].astype(str)
+    out = {}
+    for (country, m), names in sub.groupby(["country", "mm"], sort=False)["name"]:
+        out[(country, int(m))] = tuple(names.unique())
+    return out
+
+
+def search_frame(search_data) -> pd.DataFrame:
+    """search_data 행들을 keyword / rank(없으면 999) / search_value / month 컬럼이 있는 표로 (빈 입력은 빈 표)."""
+    df = pd.DataFrame(search_data)
+    if df.empty:
+        return df
+    df = df.rename(columns={c: str(c).strip().lower() for c in df.columns})
+    if "month" not in df.columns: df["month"] = None
+    if "rank" not in df.columns: df["rank"] = None
+    if "keyword" not in df.columns:
+        key_col = next((c for c in df.columns if "key" in c), None)
+        df["keyword"] = df.get(key_col, "")
+    if "search_volume" in df.columns:
+        df["search_value"] = pd.to_numeric(df["search_volume"], errors="coerce").fillna(0)
+    else:
+        df["search_value"] = pd.to_numeric(df.get("volume", 0), errors="coerce").fillna(0)
+
+    df["rank"] = pd.to_numeric(df["rank"], errors="coerce").fillna(999).astype(int)
+    return df
+
+
+def get_search_topN_df(data, ym_str, topn=10):
+    df = search_frame(data.search_data)
+    if df.empty:
+        return df
+
+    try:
+        req_mm = int(str(ym_str).split("-")[1])
+    except Exception:
+        req_mm = None
+
+    if req_mm is not None:
+        df = df[month_numbers(df["month"]) == req_mm]
+    if df.empty:
+        return df
+
+    # 전체 정렬 대신 상위 topn 경계값(동점 포함) 안의 행만 남기고 그 안에서 같은 기준으로 정렬
+    n = len(df)
+    if (df["rank"] < 999).any():
+        if n > topn > 0:
+            rank = df["rank"].to_numpy()
+            df = df[rank <= np.partition(rank, topn - 1)[topn - 1]]
+        df = df.sort_values(["rank", "search_value"], ascending=[True, False])
+    else:
+        if n > topn > 0:
+            vals = df["search_value"].to_numpy()
+            df = df[vals >= np.partition(vals, n - topn)[n - topn]]
+        # 동점은 입력 순서 유지 (예전 전체 quicksort 의 동점 순서는 정의되지 않은 값이었음)
+        df = df.sort_values("search_value", ascending=False, kind="stable")
+
+    return df.head(topn)[["keyword","rank","search_value"]]
+
+
+def theme_tokens(theme_item) -> list:
+    """테마 이름을 쪼갠 단어 + products 키워드 (소문자, 중복 제거, 순서 유지)."""
+    theme_txt = (theme_item.get("theme") or "").lower()
+    prod_keywords = [str(x).lower() for x in (theme_item.get("products") or []) if str(x).strip()]
+    tokens = []
+    if theme_txt:
+        tokens += re.split(r"[\s,\/\|·•]+", theme_txt)
+    tokens += prod_keywords
+    tokens = [w.strip() for w in tokens if w.strip()]
+    return list(dict.fromkeys(tokens))
+
+
+class ThemeIndex:
+    """추천 상품(name + category) 위의 1·2-gram 역색인.
+    테마마다 전체 상품을 다시 훑으며 부분문자열 검색을 하는 대신, 토큰의 가장 드문 2-gram
+    포스팅만 확인해 후보를 뽑는다. fetch(payload)·국가당 한 번 만든다."""
+    __slots__ = ("items", "texts", "grams", "base_order")
+
+    def __init__(self, items):
+        self.items = tuple(items)                 # 점수 내림차순으로 정렬된 RecItem
+        self.texts = [
+            f"{str(it.name if it.name is not None else '').lower()} {str(it.category if it.category is not None else '').lower()}"
+            for it in self.items
+        ]
+        grams = {}
+        for i, txt in enumerate(self.texts):
+            for g in set(txt) | {txt[j:j + 2] for j in range(len(txt) - 1)}:
+                grams.setdefault(g, []).append(i)
+        self.grams = grams
+        # 매칭이 없는 상품은 (점수, 원래 순서) 로 채운다
+        self.base_order = sorted(range(len(self.items)), key=lambda i: -(self.items[i].score or 0))
+
+    def candidates(self, token: str):
+        if len(token) == 1:
+            return self.grams.get(token, ())
+        postings = []
+        for j in range(len(token) - 1):
+            p = self.grams.get(token[j:j + 2])
+            if p is None:
+                return ()
+            postings.append(p)
+        return [i for i in min(postings, key=len) if token in self.texts[i]]
+
+    def top_for_theme(self, tokens, used_skus, k: int = 5) -> list:
+        """(매칭 토큰 수, 점수) 내림차순 상위 k 개. used_skus 에 있는 상품은 제외,
+        남은 상품이 없으면 전체 상위 k 개 (예전 동작과 동일)."""
+        hits = Counter()
+        for w in tokens:
+            if w:
+                hits.update(self.candidates(w))
+        items = self.items
+        free = lambda i: items[i].sku not in used_skus
+        top = heapq.nsmallest(
+            k, (i for i in hits if free(i)),
+            key=lambda i: (-hits[i], -(items[i].score or 0), i),
+        )
+        if len(top) < k:
+            for i in self.base_order:
+                if i not in hits and free(i):
+                    top.append(i)
+                    if len(top) >= k:
+                        break
+        if not top:
+            return list(items[:k])
+        return [items[i] for i in top]
+
+
+def compare_months(results: dict, regions, topn: int = 3) -> pd.DataFrame:
+    """여러 달 payload ({month: Payload 또는 Exception}) 를 (월, 국가) 한 행씩 비교표로 합친다."""
+    rows = []
+    for ym, data in results.items():
+        if isinstance(data, BaseException):
+            rows += [{"월": ym, "국가": rg, "오류": str(data) or type(data).__name__} for rg in regions]
+            continue
+        try:
+            month_int = int(str(ym).split("-")[1])
+        except (IndexError, ValueError):
+            month_int = None
+        s_df = get_search_topN_df(data, ym, topn=topn)
+        keywords = ", ".join(map(str, s_df["keyword"])) if not s_df.empty else ""
+        for rg in regions:
+            recs = data.rec_items(rg)
+            themes = list(dict.fromkeys(
+                (it.get("theme") or "").strip() for it in data.promo_items(rg) if (it.get("theme") or "").strip()
+            ))
+            rows.append({
+                "월": ym,
+                "국가": rg,
+                "연휴": ", ".join(data.holiday_names(rg, month_int)) if month_int else "",
+                f"인기검색어 Top{topn}": keywords,
+                "프로모션 테마": ", ".join(themes[:4]),
+                "추천 상품 수": len(recs),
+                "최고 점수 상품": recs[0].name if recs else None,
+                "최고 점수": recs[0].score if recs else None,
+                "이전 데이터": data.stale,
+            })
+    return pd.DataFrame(rows)
+
+
+# ---- 국가별 화면 뷰 (fetch·월당 한 번 계산해 모든 세션이 공유) ----
+TREND_SECTIONS = (
+    ("🌤️ 주요 이슈", "macro_issue"),
+    ("🛍️ 쇼핑 트렌드", "shopping_trend"),
+    ("👥 소비자 행동", "consumer_behavior"),
+    ("✈️ 여행·레저", "travel_leisure"),
+    ("🏷️ 카테고리/브랜드", "brand_highlight"),
+    ("🎯 프로모션 시사점", "promotion_implication"),
+)
+
+
+def as_list(x):
+    if x is None:
+        return []
+    if isinstance(x, (list, tuple, set)):
+        return [str(i).strip() for i in x if str(i).strip()]
+    parts = re.split(r"[•·;\n]|,\s*", str(x))
+    return [p.strip() for p in parts if p and p.strip()]
+
+
+def hashtag_pills_html(tags) -> str:
+    tags = [str(t).strip() for t in (tags or []) if str(t).strip()]
+    if not tags:
+        return ""
+    def _fmt(t): return t if str(t).startswith("#") else "#"+str(t)
+    return '<div class="pills">' + "".join([f'<span class="pill">{_fmt(t)}</span>' for t in tags]) + "</div>"
+
+
+@dataclass(frozen=True, slots=True)
+class RegionView:
+    trend: tuple        # (제목, 해시태그 pills HTML, 불릿 markdown) × TREND_SECTIONS
+    holidays: tuple     # 선택 월의 연휴 이름
+    themes: tuple       # (제목, 배지 텍스트, 추천 상품 DataFrame) 최대 4개
+
+
+def trend_sections(info: dict) -> tuple:
+    hs = (info.get("hashtags") or {})
+    out = []
+    for title, key in TREND_SECTIONS:
+        txt = info.get(key)
+        items = as_list(txt)
+        bullets = "\n".join([f"- {it}" for it in items]) if items else (f"- {txt}" if (txt or "").strip() else "")
+        out.append((title, hashtag_pills_html(hs.get(key)), bullets))
+    return tuple(out)
+
+
+def theme_tables(data, region: str, n_themes: int = 4, k: int = 5) -> tuple:
+    """프로모션 테마(중복 제외 최대 n_themes 개)별 추천 상품 표. 상품은 테마 간 중복 없이 k 개씩."""
+    seen_theme = set()
+    themes = []
+    for it in data.promo_items(region):
+        th = (it.get("theme") or "").strip()
+        if not th or th in seen_theme:
+            continue
+        themes.append(it)
+        seen_theme.add(th)
+        if len(themes) >= n_themes:
+            break
+    if not themes:
+        return ()
+
+    index = ThemeIndex(data.rec_items(region))
+    used_skus = set()
+    out = []
+    for t in themes:
+        top = index.top_for_theme(theme_tokens(t), used_skus, k=k)
+        for it in top:
+            if it.sku:
+                used_skus.add(it.sku)
+        df_view = pd.DataFrame([{
+            "상품명": it.name,
+            "카테고리": it.category,
+            "재고": it.stock,
+            "score_total": it.score,
+            "suggested_mechanic": it.suggested_mechanic,
+        } for it in top])
+        if "score_total" in df_view.columns:
+            df_view["score_total"] = pd.to_numeric(df_view["score_total"], errors="coerce")
+            df_view = df_view.sort_values("score_total", ascending=False)
+        out.append((t.get("theme", "테마"), t.get("theme") or "테마", df_view.reset_index(drop=True)))
+    return tuple(out)
+
+
+def build_region_views(data, ym_str, regions) -> dict:
+    """regions 전부의 RegionView 를 한 번에 만든다 ({region: RegionView}). 단계별(trend/holidays/theme_match) 시간을 남긴다."""
+    try:
+        month_int = int(str(ym_str).split("-")[1])
+    except (IndexError, ValueError):
+        month_int = None
+    out = {}
+    for rg in regions:
+        with METRICS.timer("trend", region=rg):
+            trend = trend_sections(data.region_info(rg))
+        with METRICS.timer("holidays", region=rg):
+            holidays = data.holiday_names(rg, month_int) if month_int else ()
+        with METRICS.timer("theme_match", region=rg):
+            themes = theme_tables(data, rg)
+        out[rg] = RegionView(trend=trend, holidays=holidays, themes=themes)
+    return out
@@ -0,0 +1,195 @@
+# plan_export.py
+# 프로모션 기획표(국가 × 월 × 테마별 추천 상품) zip 내보내기.
+# (월, 국가) 단위로 행 묶음을 써 가며 압축된 바이트 조각을 내보내는 제너레이터 + 조각을 이어 붙이는 zip_bytes.
+# payload 는 한 달씩 받아 쓰고 놓으므로 만드는 동안에는 한 달치 + 한 묶음 정도만 든다.
+# 다만 st.download_button 은 bytes/BytesIO 만 받으므로 내려받기 경로에서는 완성된 zip 한 벌이 메모리에 있다.
+import csv, io, os, tempfile, zipfile
+
+try:
+    import xlsxwriter
+except ImportError:                                 # 선택 의존성 (XLSX 내보내기, 없으면 openpyxl)
+    xlsxwriter = None
+try:
+    import openpyxl
+except ImportError:                                 # 선택 의존성
+    openpyxl = None
+
+from payload_views import theme_tables
+
+PLAN_COLUMNS = ("월", "국가", "테마", "순번", "상품명", "카테고리", "재고", "score_total", "suggested_mechanic")
+REC_COLUMNS = ("월", "국가", "sku", "상품명", "카테고리", "재고", "score_total", "suggested_mechanic")
+BATCH_ROWS = 5_000                                  # 한 번에 쓰고 내보내는 행 수
+COPY_CHUNK = 1024 * 1024
+
+
+def xlsx_available() -> bool:
+    return xlsxwriter is not None or openpyxl is not None
+
+
+def _cell(v):
+    # CSV/XLSX 칸 값: 결측은 빈 칸, 숫자/문자 외(리스트/딕트 등)는 문자열로
+    if v is None or (isinstance(v, float) and v != v):
+        return None
+    if isinstance(v, (str, int, float, bool)):
+        return v
+    return str(v)
+
+
+def plan_rows(data, month: str, region: str, n_themes: int = 4, k: int = 5):
+    """화면의 '프로모션 컨셉&상품추천' 표와 같은 내용 (테마별 상위 k 개, 테마 간 상품 중복 없음)."""
+    cols = ["상품명", "카테고리", "재고", "score_total", "suggested_mechanic"]
+    for title, _, df in theme_tables(data, region, n_themes=n_themes, k=k):
+        if df.empty:
+            continue
+        for i, row in enumerate(df.reindex(columns=cols).itertuples(index=False, name=None), 1):
+            yield (month, region, title, i) + tuple(_cell(v) for v in row)
+
+
+def rec_rows(data, month: str, region: str):
+    """국가의 추천 상품 전체 (점수 내림차순)."""
+    for it in data.rec_items(region):
+        yield (month, region) + tuple(_cell(v) for v in (it.sku, it.name, it.category, it.stock, it.score,
+                                                          it.suggested_mechanic))
+
+
+class _Sink:
+    # zipfile 이 쓰는 바이트를 모아 두었다가 take() 때 넘긴다. tell/seek 이 없으면 zipfile 은 스트리밍 모드로 쓴다
+    def __init__(self):
+        self._parts = []
+
+    def write(self, b) -> int:
+        self._parts.append(bytes(b))
+        return len(b)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        out = b"".join(self._parts)
+        self._parts.clear()
+        return out
+
+
+def _csv_entry(zf, sink, name: str, header, rows, batch_rows: int):
+    with zf.open(name, "w", force_zip64=True) as raw:
+        text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")   # 엑셀에서 한글이 깨지지 않게 BOM
+        w = csv.writer(text)
+        w.writerow(header)
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_rows:
+                w.writerows(batch)
+                batch.clear()
+                text.flush()
+                yield sink.take()
+        w.writerows(batch)
+        text.flush()
+        text.detach()
+    yield sink.take()
+
+
+def _error_entry(zf, sink, name: str, e: Exception):
+    zf.writestr(name, f"{type(e).__name__}: {e}\n")
+    yield sink.take()
+
+
+def _iter_payloads(loader, months):
+    # 한 달씩 받는다: 다음 달로 넘어가면 이전 달 payload 는 놓는다
+    for month in months:
+        try:
+            yield month, loader(month), None
+        except Exception as e:
+            yield month, None, e
+
+
+def iter_zip(loader, months, regions, fmt: str = "csv", with_recommended: bool = False,
+             batch_rows: int = BATCH_ROWS):
+    """zip 바이트 조각을 차례로 내보낸다. loader(month) -> Payload (실패한 달은 <월>/ERROR.txt 로 남김).
+
+    - csv: <월>/<국가>_plan.csv (+ <국가>_recommended.csv). 묶음마다 바로 내보낸다
+    - xlsx: promo_plans.xlsx 하나 (국가별 시트). 워크북은 임시 파일에 행 단위로 쓰고(메모리 일정) 끝나면 조각내 보낸다
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        if fmt == "csv":
+            for month, data, err in _iter_payloads(loader, months):
+                if err is not None:
+                    yield from _error_entry(zf, sink, f"{month}/ERROR.txt", err)
+                    continue
+                for region in regions:
+                    yield from _csv_entry(zf, sink, f"{month}/{region}_plan.csv", PLAN_COLUMNS,
+                                          plan_rows(data, month, region), batch_rows)
+                    if with_recommended:
+                        yield from _csv_entry(zf, sink, f"{month}/{region}_recommended.csv", REC_COLUMNS,
+                                              rec_rows(data, month, region), batch_rows)
+        elif fmt == "xlsx":
+            yield from _xlsx_entry(zf, sink, loader, months, regions, with_recommended)
+        else:
+            raise ValueError(f"unknown format: {fmt}")
+    yield sink.take()
+
+
+def _xlsx_entry(zf, sink, loader, months, regions, with_recommended: bool):
+    if not xlsx_available():
+        raise RuntimeError("XLSX 내보내기에는 xlsxwriter 또는 openpyxl 이 필요합니다.")
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        errors = _write_workbook(path, loader, months, regions, with_recommended)
+        for month, e in errors:
+            yield from _error_entry(zf, sink, f"{month}/ERROR.txt", e)
+        with open(path, "rb") as src, zf.open("promo_plans.xlsx", "w", force_zip64=True) as dst:
+            for chunk in iter(lambda: src.read(COPY_CHUNK), b""):
+                dst.write(chunk)
+                yield sink.take()
+        yield sink.take()
+    finally:
+        os.remove(path)
+
+
+def _write_workbook(path: str, loader, months, regions, with_recommended: bool) -> list:
+    # 시트: <국가> (기획표), <국가>_추천 (추천 상품 전체). 두 라이브러리 모두 행을 순서대로 흘려 쓰는 모드
+    sheets = [(r, PLAN_COLUMNS, plan_rows) for r in regions]
+    if with_recommended:
+        sheets += [(r, REC_COLUMNS, rec_rows) for r in regions]
+    names = [r if cols is PLAN_COLUMNS else f"{r}_추천" for r, cols, _ in sheets]
+    errors = []
+    if xlsxwriter is not None:
+        wb = xlsxwriter.Workbook(path, {"constant_memory": True})
+        ws = [wb.add_worksheet(n) for n in names]
+        next_row = [1] * len(ws)
+        for w, (_, cols, _) in zip(ws, sheets):
+            w.write_row(0, 0, cols)
+        for month, data, err in _iter_payloads(loader, months):
+            if err is not None:
+                errors.append((month, err))
+                continue
+            for i, (region, _, rows) in enumerate(sheets):
+                for row in rows(data, month, region):
+                    ws[i].write_row(next_row[i], 0, row)
+                    next_row[i] += 1
+        wb.close()
+    else:
+        wb = openpyxl.Workbook(write_only=True)
+        ws = [wb.create_sheet(n) for n in names]
+        for w, (_, cols, _) in zip(ws, sheets):
+            w.append(cols)
+        for month, data, err in _iter_payloads(loader, months):
+            if err is not None:
+                errors.append((month, err))
+                continue
+            for i, (region, _, rows) in enumerate(sheets):
+                for row in rows(data, month, region):
+                    ws[i].append(row)
+        wb.save(path)
+    return errors
+
+
+def zip_bytes(chunks) -> bytes:
+    """조각들을 이어 붙인 zip 전체. st.download_button 은 파일 전체를 메모리에 올려 서빙하므로
+    내려받기 경로에서는 결국 한 벌이 메모리에 있다 (행 묶음 단위 생성은 만드는 동안의 메모리만 줄인다)."""
+    buf = io.BytesIO()
+    for c in chunks:
+        buf.write(c)
+    return buf.getvalue()
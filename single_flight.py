@@ -0,0 +1,45 @@
+# single_flight.py
+# 같은 키의 동시 호출 합치기 (single-flight).
+# 여러 세션이 같은 월을 동시에 열면 st.cache_data 가 아직 비어 있어 각자 30~120초짜리 webhook 을 부른다.
+# 진행 중인 호출이 있으면 새로 부르지 않고 그 결과(또는 예외)를 함께 기다린다.
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}            # key → Future (진행 중인 호출)
+        self.coalesced = 0          # 합쳐져서 생략된 호출 수 (누적)
+
+    def do(self, key, fn, *args, **kwargs):
+        """key 로 진행 중인 호출이 있으면 그 결과를 기다려 반환, 없으면 fn 을 직접 실행."""
+        with self._lock:
+            fut = self._calls.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return fut.result()
+        try:
+            res = fn(*args, **kwargs)
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(res)
+            return res
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def pending(self, key):
+        """진행 중인 호출의 Future (없으면 None). 스레드를 따로 잡지 않고 결과만 기다릴 때."""
+        with self._lock:
+            return self._calls.get(key)
+
+    def inflight(self, key) -> bool:
+        with self._lock:
+            return key in self._calls
@@ -1,12 +1,27 @@
 # app.py
-import os, re, json, requests
+import os, re, time, logging, requests
 import pandas as pd
-import altair as alt  # 차트는 안 쓰지만 유지 가능
+import altair as alt  # 이력 추이 차트
 import streamlit as st
 from datetime import datetime
-from requests.adapters import HTTPAdapter, Retry
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait as futures_wait
+from dataclasses import replace
+from payload_cache import PersistentCache
+from http_pool import build_session, pool_stats
+from cache_warmer import CacheWarmer
+from circuit_breaker import CLOSED, OPEN, CircuitBreaker, CircuitOpenError
+from bulk_fetch import BulkFetcher, is_rate_limited, month_range
+from history_store import HistoryStore
+from metrics import METRICS, serve_metrics
+from jsonutil import dumps
+from n8n_client import fetch_payload
+from payload_model import EMPTY_PAYLOAD, payload_from_dict, payload_hash
+from payload_store import PayloadStore
+from plan_export import iter_zip, xlsx_available, zip_bytes
+from payload_views import build_region_views, compare_months, get_search_topN_df, hashtag_pills_html
 
 st.set_page_config(page_title="Duty-free Promo Planner", layout="wide")
+log = logging.getLogger("promo_dashboard")
 
 # -----------------------------
 # Config  (수정 금지)
@@ -16,6 +31,51 @@ DEFAULT_WEBHOOK = os.environ.get(
     "https://hyunji6.app.n8n.cloud/webhook-test/8d05730a-0bc0-48d0-b580-c268a1b753ce"
 )
 
+# -----------------------------
+# Cache 설정 (env 로 조정)
+# -----------------------------
+CACHE_TTL = int(os.environ.get("N8N_CACHE_TTL", "600"))                 # 초, 이후엔 stale 로 보고 재검증
+CACHE_MAX_MB = int(os.environ.get("N8N_CACHE_MAX_MB", "256"))           # 디스크 캐시 최대 크기
+CACHE_PATH = os.environ.get(
+    "N8N_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "n8n_payloads.sqlite3")
+)
+HISTORY_PATH = os.environ.get(                                         # 받은 달을 쌓아 두는 Parquet 이력 (만료 없음)
+    "N8N_HISTORY_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "history")
+)
+
+# -----------------------------
+# HTTP 연결 풀 설정 (env 로 조정)
+# -----------------------------
+HTTP_POOL_CONNECTIONS = int(os.environ.get("N8N_POOL_CONNECTIONS", "4"))   # host 별 pool 수
+HTTP_POOL_MAXSIZE = int(os.environ.get("N8N_POOL_MAXSIZE", "16"))          # pool 당 유지할 keep-alive 연결 수
+HTTP_KEEPALIVE_SEC = int(os.environ.get("N8N_KEEPALIVE_SEC", "60"))        # TCP keepalive idle
+HTTP_RETRY_TOTAL = int(os.environ.get("N8N_RETRY_TOTAL", "2"))
+HTTP_RETRY_BACKOFF = float(os.environ.get("N8N_RETRY_BACKOFF", "0.8"))
+RAW_PAGE_LINES = int(os.environ.get("N8N_RAW_PAGE_LINES", "400"))          # Raw JSON 텍스트 한 페이지 줄 수
+FETCH_WORKERS = int(os.environ.get("N8N_FETCH_WORKERS", "4"))              # 백그라운드 수집 스레드 수
+FETCH_POLL_SEC = float(os.environ.get("N8N_FETCH_POLL_SEC", "1.0"))        # 수집 완료 확인 주기
+PREFETCH_WORKERS = int(os.environ.get("N8N_PREFETCH_WORKERS", "2"))        # 인접 월 선조회 동시성
+WARM_INTERVAL_SEC = float(os.environ.get("N8N_WARM_INTERVAL_SEC", "1800")) # 이번 달/다음 달 주기 워밍 (0 이면 시작 시 1회)
+BULK_WORKERS = int(os.environ.get("N8N_BULK_WORKERS", "6"))                # 여러 달 비교 시 동시 호출 수 (429 면 자동으로 줄임)
+BULK_MAX_ATTEMPTS = int(os.environ.get("N8N_BULK_MAX_ATTEMPTS", "4"))      # 429 시 월별 최대 시도 횟수
+REGIONS = ["KR", "JP", "CN", "SEA"]
+
+# -----------------------------
+# 장애 대응 (env 로 조정)
+# -----------------------------
+FETCH_DEADLINE_SEC = float(os.environ.get("N8N_FETCH_DEADLINE_SEC", "90"))  # 한 달 수집을 기다리는 최대 시간 (넘으면 이전 값 표시)
+BREAKER_FAILURES = int(os.environ.get("N8N_BREAKER_FAILURES", "3"))         # 연속 실패 N 번이면 호출 차단
+BREAKER_RESET_SEC = float(os.environ.get("N8N_BREAKER_RESET_SEC", "60"))    # 차단 후 시험 호출까지 대기
+
+# -----------------------------
+# 성능 지표 (env 로 조정)
+# -----------------------------
+DEBUG_PANEL = os.environ.get("N8N_DEBUG", "") == "1"                       # 항상 디버그 패널 표시 (아니면 ?debug=1)
+METRICS_PORT = int(os.environ.get("N8N_METRICS_PORT", "0"))                # >0 이면 :PORT/metrics 텍스트 지표
+METRICS_LOG = os.environ.get("N8N_METRICS_LOG", "") == "1"                 # 단계별 소요 시간을 JSON 로그로
+
 # -----------------------------
 # Light styling 💅
 # -----------------------------
@@ -67,95 +127,18 @@ def extract_yyyy_mm(text: str, default_ym: str) -> str:
     if y_only: yyyy = y_only.group(1)
     return f"{yyyy}-{mm}"
 
-def _as_dict(obj):
-    if isinstance(obj, dict):
-        return obj
-    if isinstance(obj, str):
-        s = obj.strip()
-        try:
-            return _as_dict(json.loads(s))
-        except Exception:
-            m = re.search(r"```(?:json)?\s*([\s\S]*?)\s*```", s, re.I)
-            if m:
-                try:
-                    return _as_dict(json.loads(m.group(1).strip()))
-                except Exception:
-                    pass
-            return {}
-    if isinstance(obj, list):
-        out = {}
-        for it in obj:
-            d = it.get("json", it) if isinstance(it, dict) else {}
-            for k in [
-                "reply","search_data","calendar","promotions",
-                "search_data_raw","calendar_raw","catalog_raw",
-                "recommended_products_by_region","restock_alerts"
-            ]:
-                if k in d and k not in out:
-                    out[k] = d[k]
-            if isinstance(d.get("ats"), dict):
-                out["ats"] = d["ats"]
-            if "promotions_by_region" in d:
-                out["promotions_by_region"] = d["promotions_by_region"]
-        return out
-    return {}
-
-def normalize_payload(obj):
-    d = _as_dict(obj)
-    ats = d.get("ats") or {}
-    if isinstance(ats, str):
-        try:
-            ats = json.loads(ats)
-        except Exception:
-            ats = {}
-    regions = ats.get("regions")
-    if isinstance(regions, dict):
-        regions = [{"region": k, **(v if isinstance(v, dict) else {})} for k, v in regions.items()]
-    if not isinstance(regions, list):
-        regions = []
-
-    calendar = d.get("calendar_raw")
-    if not isinstance(calendar, list):
-        calendar = d.get("calendar") if isinstance(d.get("calendar"), list) else []
-    search_data = d.get("search_data_raw")
-    if not isinstance(search_data, list):
-        search_data = d.get("search_data") if isinstance(d.get("search_data"), list) else []
-
-    catalog = d.get("catalog_raw") if isinstance(d.get("catalog_raw"), list) else []
-    rec_by_region = d.get("recommended_products_by_region") if isinstance(d.get("recommended_products_by_region"), list) else []
-    restock_alerts = d.get("restock_alerts") if isinstance(d.get("restock_alerts"), list) else []
-
-    return {
-        "reply": d.get("reply") or "",
-        "search_data": search_data,
-        "calendar": calendar,
-        "catalog_raw": catalog,
-        "recommended_products_by_region": rec_by_region,
-        "restock_alerts": restock_alerts,
-        "promotions": [],
-        "promotions_by_region": d.get("promotions_by_region") if isinstance(d.get("promotions_by_region"), list) else [],
-        "ats": {"month": (ats.get("month") or ""), "regions": regions},
-        "_raw": d,
-    }
+def shift_month(ym: str, delta: int) -> str:
+    yyyy, mm = (int(x) for x in ym.split("-"))
+    n = yyyy * 12 + (mm - 1) + delta
+    return f"{n // 12}-{n % 12 + 1:02d}"
 
 def flag(region: str) -> str:
     return {"KR":"🎎","CN":"🐉","JP":"🎌","SEA":"🌴"}.get(region, "🏳️")
 
-def _as_list(x):
-    if x is None:
-        return []
-    if isinstance(x, (list, tuple, set)):
-        return [str(i).strip() for i in x if str(i).strip()]
-    parts = re.split(r"[•·;\n]|,\s*", str(x))
-    return [p.strip() for p in parts if p and p.strip()]
-
 def render_hashtag_pills(tags):
-    tags = [t.strip() for t in (tags or []) if str(t).strip()]
-    if not tags:
-        return
-    def _fmt(t): return t if str(t).startswith("#") else "#"+str(t)
-    html = '<div class="pills">' + "".join([f'<span class="pill">{_fmt(t)}</span>' for t in tags]) + "</div>"
-    st.markdown(html, unsafe_allow_html=True)
+    html = hashtag_pills_html(tags)
+    if html:
+        st.markdown(html, unsafe_allow_html=True)
 
 def skeleton_holidays(region="KR"):
     with st.container(border=True):
@@ -164,46 +147,173 @@ def skeleton_holidays(region="KR"):
 
 def skeleton_search_topN(n=10):
     df = pd.DataFrame({"keyword": [f"검색어 {i}" for i in range(n, 0, -1)], "rank": list(range(1,n+1)), "search_volume":[0]*n})
-    st.dataframe(df, use_container_width=True, hide_index=True)
+    st.dataframe(df, width="stretch", hide_index=True)
     st.caption("데이터 로딩 전 미리보기")
 
 # -----------------------------
 # n8n caller
 # -----------------------------
-def call_n8n(webhook: str, month_ym: str):
-    if not webhook:
-        raise RuntimeError("Webhook URL이 설정되지 않았습니다.")
-    payload = {
-        "content": f"{month_ym} 프로모션 추천",
-        "month": month_ym,
-        "year": month_ym.split("-")[0],
-        "chat_history": []
-    }
-    sess = requests.Session()
-    retry = Retry(
-        total=2, connect=2, read=2, backoff_factor=0.8,
-        status_forcelist=(429, 500, 502, 503, 504),
-        allowed_methods=["POST"]
+@st.cache_resource(show_spinner=False)
+def get_http_session():
+    # 프로세스당 1개: 사용자/리런/백그라운드 스레드가 keep-alive 연결을 공유
+    return build_session(
+        pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE,
+        keepalive_idle=HTTP_KEEPALIVE_SEC,
+        retry_total=HTTP_RETRY_TOTAL, retry_backoff=HTTP_RETRY_BACKOFF,
     )
-    adapter = HTTPAdapter(max_retries=retry)
-    sess.mount("https://", adapter); sess.mount("http://", adapter)
 
-    r = sess.post(webhook, json=payload, timeout=(5, 120))
-    r.raise_for_status()
-    try:
-        parsed = r.json()
-    except Exception:
-        parsed = r.text
-    return normalize_payload(parsed)
+@st.cache_resource(show_spinner=False)
+def get_circuit_breaker(webhook: str):
+    # webhook 당 1개: 화면/워밍/일괄 수집이 같은 차단 상태를 본다. 429 는 장애가 아니라 속도 조절 신호라 세지 않는다
+    return CircuitBreaker(BREAKER_FAILURES, BREAKER_RESET_SEC, name="n8n", ignore=is_rate_limited)
+
+@st.cache_resource(show_spinner=False)
+def get_history_store():
+    return HistoryStore(HISTORY_PATH)
 
-@st.cache_data(ttl=600, show_spinner=False)
+def call_n8n(webhook: str, month_ym: str, prev=None):
+    # prev(캐시에 있던 값)가 있으면 조건부 요청: 바뀐 게 없으면 prev 를 그대로 돌려받는다
+    if not webhook:
+        raise RuntimeError("Webhook URL이 설정되지 않았습니다.")
+    # 호출 자체도 FETCH_DEADLINE_SEC 안에서 끝낸다 (재시도/대기 포함). n8n 이 멈춰 있으면 실패로 세어 차단기가 열린다
+    deadline = time.monotonic() + FETCH_DEADLINE_SEC
+    payload = get_circuit_breaker(webhook).call(fetch_payload, get_http_session(), webhook, month_ym, prev=prev,
+                                                deadline=deadline)
+    get_history_store().append_async(month_ym, payload)   # 이미 같은 버전이 있으면 건너뜀 (뒤에서 기록)
+    return payload
+
+@st.cache_resource(show_spinner=False)
+def get_payload_cache():
+    # 프로세스당 1개, 재시작 후에도 디스크에 남아 콜드스타트를 웜스타트처럼 만든다
+    return PersistentCache(CACHE_PATH, max_bytes=CACHE_MAX_MB * 1024 * 1024, ttl=CACHE_TTL,
+                           encode=lambda p: p.to_dict(), decode=payload_from_dict)
+
+@st.cache_resource(show_spinner=False)
+def get_cache_warmer():
+    # 시작 시(첫 접속) 이번 달/다음 달을 채우고, 이후 WARM_INTERVAL_SEC 마다 반복
+    warmer = CacheWarmer(get_payload_cache(), call_n8n, max_workers=PREFETCH_WORKERS)
+    def _months():
+        this_ym = datetime.today().strftime("%Y-%m")
+        return [this_ym, shift_month(this_ym, 1)]
+    warmer.start_schedule(DEFAULT_WEBHOOK, _months, WARM_INTERVAL_SEC)
+    return warmer
+
+# 메모리(st.cache_data) → 디스크(SQLite) → n8n 순서. 두 계층 모두 만료 시 기존 값을 먼저 돌려주고 뒤에서 갱신
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False, refresh_mode="background")
 def fetch_cached(webhook: str, month_ym: str):
-    return call_n8n(webhook, month_ym)
+    # (payload, fresh). 디스크의 만료된 값(fresh=False)은 _load_payload 가 이 항목을 비워 TTL 동안 새 값처럼 남지 않게 한다
+    METRICS.inc("cache_lookups", layer="memory", result="miss")
+    return get_payload_cache().fetch(webhook, month_ym, call_n8n, with_freshness=True)
+
+@st.cache_resource(show_spinner=False)
+def get_call_executor():
+    # fetch_cached 를 마감 시간과 함께 기다리기 위한 스레드. n8n 호출도 마감 안에서 끝나므로 오래 묶이지 않는다
+    return ThreadPoolExecutor(max_workers=FETCH_WORKERS + BULK_WORKERS, thread_name_prefix="n8n-call")
+
+def stale_payload(webhook: str, month_ym: str, expired_only: bool = False):
+    # 디스크에 남은 마지막 값을 stale 표시해서. 없으면 (expired_only 면 아직 유효해도) None
+    hit = get_payload_cache().get(webhook, month_ym)
+    if hit is None:
+        return None
+    payload, fetched_at = hit
+    if expired_only and time.time() - fetched_at < CACHE_TTL:
+        return None
+    return replace(payload, stale=True, fetched_at=fetched_at)
+
+@st.cache_resource(show_spinner=False)
+def get_payload_store():
+    # 프로세스당 1개: 세션들은 여기서 받은 핸들만 들고 같은 payload/파생 표를 공유한다
+    return PayloadStore()
+
+@st.cache_resource(show_spinner=False)
+def get_empty_handle():
+    # 로딩 중/데이터 없음 화면용. 여기서 잡고 있어 빈 화면의 파생 결과도 한 번만 만든다
+    return get_payload_store().intern("", "", EMPTY_PAYLOAD)
+
+class FetchAbandoned(Exception):
+    """화면이 다른 달로 넘어가 더 기다리지 않는 수집 (n8n 호출은 계속 돌아 캐시를 채운다)."""
+
+def _await(fut, cancel=None):
+    # fut 를 FETCH_DEADLINE_SEC 까지 기다린다. cancel(Future) 이 먼저 끝나면 기다리기만 그만두고 스레드를 놓는다
+    if cancel is None:
+        return fut.result(timeout=FETCH_DEADLINE_SEC)
+    futures_wait([fut, cancel], timeout=FETCH_DEADLINE_SEC, return_when=FIRST_COMPLETED)
+    if not fut.done() and cancel.done():
+        raise FetchAbandoned()
+    return fut.result(timeout=0)
+
+def load_month(webhook: str, month_ym: str, bulk: bool = False, cancel=None):
+    # 화면/일괄 수집 공용 진입점. 세션에는 공용 저장소의 핸들만 돌려준다
+    # bulk 면 429 를 그대로 올려 BulkFetcher 가 동시성을 줄이고 재시도하게 한다 (화면은 이전 값으로 대체)
+    payload = _load_payload(webhook, month_ym, bulk, cancel)
+    get_history_store().append_async(month_ym, payload)   # 이력 도입 전에 캐시된 달도 보는 순간 쌓인다
+    return get_payload_store().intern(webhook, month_ym, payload)
+
+def _load_payload(webhook: str, month_ym: str, bulk: bool = False, cancel=None):
+    # 메모리 캐시 조회 수와 전체 소요 시간을 남긴다 (메모리 히트 = 조회 - 미스)
+    # FETCH_DEADLINE_SEC 안에 못 받거나 차단/실패면 이전 값을 stale 로 표시해 돌려준다 (이전 값도 없으면 예외)
+    METRICS.inc("cache_lookups", layer="memory", result="lookup")
+    cache = get_payload_cache()
+    with METRICS.timer("fetch", month=month_ym):
+        pending = cache.pending(webhook, month_ym)
+        if pending is not None and not cache.contains(webhook, month_ym):
+            # 같은 달을 이미 받는 중이고 내줄 값도 없으면 스레드를 하나 더 잡지 않고 그 호출의 결과만 기다린다
+            fut, joined = pending, True
+        else:
+            fut, joined = get_call_executor().submit(fetch_cached, webhook, month_ym), False
+        try:
+            res = _await(fut, cancel)
+            res, fresh = (res, True) if joined else res
+        except FetchAbandoned:
+            raise
+        except FutureTimeout:
+            reason = "deadline"
+            err = TimeoutError(f"{FETCH_DEADLINE_SEC:.0f}초 안에 n8n 응답이 없습니다")
+        except CircuitOpenError as e:
+            reason, err = "circuit_open", e
+        except Exception as e:
+            if not is_rate_limited(e):
+                reason, err = "error", e
+            elif bulk:
+                raise
+            else:
+                reason, err = "rate_limited", e
+        else:
+            if not fresh:
+                # 만료된 디스크 값이 메모리 캐시에 한 TTL 더 남으면 최대 2×TTL 지난 값을 보게 된다.
+                # 비워 두면 다음 조회가 다시 디스크를 보고, 뒤에서 갱신이 끝났으면 새 값을 가져간다
+                fetch_cached.clear(webhook, month_ym)
+            # 캐시는 만료된 값을 먼저 내주고 뒤에서 갱신한다. 갱신이 막혀 있으면 그 값이 오래됐다고 표시
+            if get_circuit_breaker(webhook).state == CLOSED and not cache.is_failing(webhook, month_ym):
+                return res
+            stale = stale_payload(webhook, month_ym, expired_only=True)
+            if stale is None:
+                return res
+            METRICS.inc("stale_served", reason="revalidate_failed")
+            return stale
+    stale = stale_payload(webhook, month_ym)
+    if stale is None:
+        raise err
+    METRICS.inc("stale_served", reason=reason)
+    log.warning("n8n 수집 실패 (%s, %s): 이전 값으로 대체 - %s", month_ym, reason, err)
+    return stale
+
+@st.cache_resource(show_spinner=False)
+def get_metrics_server():
+    # 프로세스당 1회: 모니터링용 텍스트 지표 엔드포인트 / JSON 로그 설정
+    if METRICS_LOG:
+        METRICS.enable_json_log()
+    return serve_metrics(METRICS, METRICS_PORT) if METRICS_PORT > 0 else None
+
+@st.cache_resource(show_spinner=False)
+def get_bulk_fetcher():
+    # 여러 달 비교용. 월별로 메모리/디스크 캐시를 거치므로 이미 받아 둔 달은 캐시에서 바로 나온다
+    return BulkFetcher(lambda w, m: load_month(w, m, bulk=True), max_workers=BULK_WORKERS, max_attempts=BULK_MAX_ATTEMPTS)
 
 # -----------------------------
 # State
 # -----------------------------
-if "data" not in st.session_state:
+if "data" not in st.session_state:                 # 받은 payload 의 핸들 (PayloadHandle, 내용은 프로세스 공용)
     st.session_state.data = None
 if "ym" not in st.session_state:                   # 실제 서버에서 받은 월(표시용/헤더용)
     st.session_state.ym = None
@@ -215,6 +325,63 @@ if "last_input_ym" not in st.session_state:
     st.session_state.last_input_ym = None
 if "sb_open" not in st.session_state:
     st.session_state.sb_open = True  # 사이드바 기본 열림
+if "fetch_job" not in st.session_state:           # 진행 중인 백그라운드 수집 {ym, future, cancel, started, manual}
+    st.session_state.fetch_job = None
+if "fetch_error" not in st.session_state:
+    st.session_state.fetch_error = None
+if "bulk_job" not in st.session_state:            # 여러 달 비교 수집 {months, future, started}
+    st.session_state.bulk_job = None
+
+# -----------------------------
+# Background fetch (스크립트를 막지 않고 수집)
+# -----------------------------
+@st.cache_resource(show_spinner=False)
+def get_fetch_executor():
+    return ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="n8n-fetch")
+
+def start_fetch(month_ym: str, manual: bool = False):
+    # 같은 월이 이미 진행 중이면 그대로 둔다. 월이 바뀌면 이전 요청의 n8n 호출은 취소하지 않고 캐시만 채우게 두되,
+    # 그 결과를 기다리던 수집 스레드는 놓아 준다 (넘겨 버린 달들이 스레드를 잡고 있어 지금 달이 줄 서지 않게)
+    job = st.session_state.fetch_job
+    st.session_state.last_input_ym = month_ym
+    if job and job["ym"] == month_ym and not job["future"].done():
+        job["manual"] = job["manual"] or manual
+        return
+    if job and not job["cancel"].done():
+        job["cancel"].set_result(None)      # cancel() 은 wait() 중인 쪽을 깨우지 않는다
+    cancel = Future()
+    st.session_state.fetch_job = {
+        "ym": month_ym,
+        "future": get_fetch_executor().submit(load_month, DEFAULT_WEBHOOK, month_ym, cancel=cancel),
+        "cancel": cancel,
+        "started": time.time(),
+        "manual": manual,
+    }
+    # 월 선택 직후 이전/다음 달을 미리 받아 두면 한 칸씩 넘길 때 대부분 캐시 히트
+    get_cache_warmer().prefetch(DEFAULT_WEBHOOK, [shift_month(month_ym, -1), shift_month(month_ym, 1)])
+
+def collect_fetch():
+    job = st.session_state.fetch_job
+    if not job or not job["future"].done():
+        return
+    st.session_state.fetch_job = None
+    # 자동 새로고침 실패도 숨기지 않는다: 화면에 표시하고 로그/지표에 남긴다
+    kind = "manual" if job["manual"] else "auto"
+    prefix = "" if job["manual"] else "자동 새로고침 "
+    try:
+        res = job["future"].result()
+    except (requests.exceptions.ReadTimeout, TimeoutError) as e:
+        log.warning("n8n 수집 시간 초과 (%s, %s): %s", job["ym"], kind, e)
+        METRICS.inc("fetch_errors", kind=kind, reason="timeout")
+        st.session_state.fetch_error = f"{prefix}요청이 시간 초과되었습니다. 다시 시도해주세요."
+    except Exception as e:
+        log.warning("n8n 수집 실패 (%s, %s): %s", job["ym"], kind, e)
+        METRICS.inc("fetch_errors", kind=kind, reason=type(e).__name__)
+        st.session_state.fetch_error = f"{prefix}데이터 수집 실패: {e}"
+    else:
+        st.session_state.data = res
+        st.session_state.ym = job["ym"]
+        st.session_state.fetch_error = None
 
 # -----------------------------
 # Sidebar toggle 버튼 (헤더 우측)
@@ -222,40 +389,60 @@ if "sb_open" not in st.session_state:
 header_l, header_c, header_r = st.columns([1, 6, 1])
 with header_l:
     st.markdown("## 📊 프로모션 자동 기획 대시보드")
+
+def _toggle_sidebar():
+    # 사이드바는 항상 렌더돼 있고 CSS 로만 숨기므로, 토글은 CSS 조각만 다시 실행 (본문 재계산 없음)
+    st.session_state.sb_open = not st.session_state.sb_open
+    st.rerun("sidebar_css")
+
 with header_r:
-    if st.button("🧰 필터 토글", use_container_width=True):
-        st.session_state.sb_open = not st.session_state.sb_open
+    st.button("🧰 필터 토글", width="stretch", on_click=_toggle_sidebar)
 
 # 사이드바 열림/닫힘 CSS
-if st.session_state.sb_open:
-    st.markdown("""
-    <style>
-    [data-testid="stSidebar"]{
-        width: 320px;
-        min-width: 320px;
-        transition: transform 300ms ease-in-out, margin-left 300ms ease-in-out;
-    }
-    </style>
-    """, unsafe_allow_html=True)
-else:
-    st.markdown("""
-    <style>
-    [data-testid="stSidebar"]{
-        transform: translateX(-360px);
-        margin-left: -360px;
-        width: 0 !important;
-        min-width: 0 !important;
-        padding: 0 !important;
-        overflow: hidden !important;
-        transition: transform 300ms ease-in-out, margin-left 300ms ease-in-out;
-    }
-    .block-container {padding-left: 1rem; padding-right: 1rem;}
-    </style>
-    """, unsafe_allow_html=True)
+@st.fragment(key="sidebar_css")
+def sidebar_css():
+    if st.session_state.sb_open:
+        st.markdown("""
+        <style>
+        [data-testid="stSidebar"]{
+            width: 320px;
+            min-width: 320px;
+            transition: transform 300ms ease-in-out, margin-left 300ms ease-in-out;
+        }
+        </style>
+        """, unsafe_allow_html=True)
+    else:
+        st.markdown("""
+        <style>
+        [data-testid="stSidebar"]{
+            transform: translateX(-360px);
+            margin-left: -360px;
+            width: 0 !important;
+            min-width: 0 !important;
+            padding: 0 !important;
+            overflow: hidden !important;
+            transition: transform 300ms ease-in-out, margin-left 300ms ease-in-out;
+        }
+        .block-container {padding-left: 1rem; padding-right: 1rem;}
+        </style>
+        """, unsafe_allow_html=True)
+
+sidebar_css()
 
 # -----------------------------
 # Sidebar (필터/동작)
 # -----------------------------
+# 국가에 따라 달라지는 조각들. 국가를 바꾸면 이 조각들만 다시 실행된다 (검색어/Raw JSON/CSS 는 그대로)
+REGION_FRAGMENTS = ["region_caption", "region_header", "now_trend", "holidays", "promotions"]
+
+def _on_region_change():
+    st.session_state.region = st.session_state.region_radio
+    st.rerun(REGION_FRAGMENTS)
+
+@st.fragment(key="region_caption")
+def region_caption():
+    st.caption(f"현재 선택: {flag(st.session_state.region)} {st.session_state.region}")
+
 def render_sidebar():
     with st.sidebar:
         st.markdown('<span class="section-title">⚙️ 분석 옵션</span>', unsafe_allow_html=True)
@@ -269,123 +456,107 @@ def render_sidebar():
         st.markdown('<div class="hr"></div>', unsafe_allow_html=True)
         st.markdown('<span class="kicker">국가 선택</span>', unsafe_allow_html=True)
         region_map = {"KR": f"{flag('KR')} KR", "JP": f"{flag('JP')} JP", "CN": f"{flag('CN')} CN", "SEA": f"{flag('SEA')} SEA"}
-        choice = st.radio(" ", list(region_map.keys()), index=list(region_map.keys()).index(st.session_state.region),
-                          format_func=lambda k: region_map[k], horizontal=False, label_visibility="collapsed")
-        st.session_state.region = choice
-        st.caption(f"현재 선택: {flag(st.session_state.region)} {st.session_state.region}")
+        st.radio(" ", list(region_map.keys()), index=list(region_map.keys()).index(st.session_state.region),
+                 format_func=lambda k: region_map[k], horizontal=False, label_visibility="collapsed",
+                 key="region_radio", on_change=_on_region_change)
+        region_caption()
 
         st.markdown('<div class="hr"></div>', unsafe_allow_html=True)
         # 수동 갱신 버튼
-        if st.button("데이터 불러오기", use_container_width=True):
-            try:
-                with st.status("데이터 불러오는 중...", expanded=False) as s:
-                    res = fetch_cached(DEFAULT_WEBHOOK, st.session_state.selected_ym)
-                    st.session_state.data = res
-                    st.session_state.ym = st.session_state.selected_ym
-                    st.session_state.last_input_ym = st.session_state.selected_ym
-                    s.update(label="완료", state="complete")
-            except requests.exceptions.ReadTimeout:
-                st.error("요청이 시간 초과되었습니다. 다시 시도해주세요.")
-            except Exception as e:
-                st.error(f"데이터 수집 실패: {e}")
+        if st.button("데이터 불러오기", width="stretch"):
+            st.session_state.fetch_error = None
+            start_fetch(st.session_state.selected_ym, manual=True)
+        if st.session_state.fetch_error:
+            st.error(st.session_state.fetch_error)
+        ps = pool_stats(get_http_session())
+        st.caption(f"🔌 n8n 연결: 요청 {ps['requests']} · 신규 연결 {ps['connections']} · 재사용 {ps['reused']}")
+        breaker = get_circuit_breaker(DEFAULT_WEBHOOK)
+        if breaker.state == OPEN:
+            st.caption(f"⛔ n8n 연속 실패로 호출 일시 중단 ({int(breaker.retry_in())}초 후 재시도)")
 
         # ✅ 입력 월 변경 자동 재요청
         if st.session_state.last_input_ym != st.session_state.selected_ym:
-            try:
-                res = fetch_cached(DEFAULT_WEBHOOK, st.session_state.selected_ym)
-                st.session_state.data = res
-                st.session_state.ym = st.session_state.selected_ym
-                st.session_state.last_input_ym = st.session_state.selected_ym
-                st.caption("자동 새로고침: 입력 월 변경 감지")
-            except Exception:
-                pass
-
-# 사이드바가 열려 있을 때만 렌더(값은 session_state로 유지)
-if st.session_state.sb_open:
-    render_sidebar()
+            start_fetch(st.session_state.selected_ym)
+            st.caption("자동 새로고침: 입력 월 변경 감지")
+
+# 끝난 수집 결과/오류를 먼저 반영해야 같은 실행에서 사이드바에 오류가 보인다
+collect_fetch()
+# 닫혀 있어도 렌더하고 CSS 로만 숨긴다 (토글 시 전체 리런 없이 열고 닫기)
+render_sidebar()
 
 # -----------------------------
 # Main (본문)
 # -----------------------------
-ym = st.session_state.ym or st.session_state.selected_ym  # ✅ 헤더는 선택 월 우선
-data = st.session_state.data or {}
+_page_t0 = time.perf_counter()
+get_metrics_server()
+get_cache_warmer()  # 프로세스 첫 실행 시 워밍 스케줄 시작
+job = st.session_state.fetch_job
+loading = job is not None and job["ym"] != st.session_state.ym  # 다른 월을 받는 중이면 스켈레톤부터
+ym = job["ym"] if loading else (st.session_state.ym or st.session_state.selected_ym)  # ✅ 헤더는 선택 월 우선
+handle = get_empty_handle() if loading or st.session_state.data is None else st.session_state.data
+data = handle.payload
 rg = st.session_state.region
 
+# (payload, 월) 당 한 번: 검색어 Top10 + 네 국가의 NOW TREND/연휴/테마별 상품 표를 미리 계산해 저장소 항목에 붙여 둔다.
+# 같은 핸들을 가진 세션끼리 공유하고, 국가 전환/리런은 읽기만 한다 (DataFrame 은 읽기 전용으로 취급).
+# 그 payload 를 보는 세션이 없어지면 payload 와 함께 사라진다.
+def build_views(data, ym: str):
+    with METRICS.timer("search_topn", month=ym):
+        search = get_search_topN_df(data, ym, topn=10)
+    with METRICS.timer("region_views", month=ym):          # 합계. 국가별 trend/holidays/theme_match 는 안에서 따로
+        regions = build_region_views(data, ym, REGIONS)
+    return {"search": search, "regions": regions}
+
+views = handle.memo(("views", ym), lambda: build_views(data, ym))
+
 # 헤더
 st.markdown(f'<div class="kicker">대상 월</div><h3 style="margin-top:.2rem;">{ym}</h3>', unsafe_allow_html=True)
-st.markdown(f'<div class="kicker">국가</div><h4 style="margin-top:.2rem;">{flag(rg)} {rg}</h4>', unsafe_allow_html=True)
+
+@st.fragment(key="region_header")
+def region_header():
+    rg = st.session_state.region
+    st.markdown(f'<div class="kicker">국가</div><h4 style="margin-top:.2rem;">{flag(rg)} {rg}</h4>', unsafe_allow_html=True)
+region_header()
+
+if data.stale:
+    st.warning(f"⚠️ n8n 응답 지연/장애로 {datetime.fromtimestamp(data.fetched_at):%Y-%m-%d %H:%M} 에 받은 "
+               "이전 데이터를 표시하고 있습니다. '데이터 불러오기'로 다시 시도할 수 있습니다.")
+
+# 수집 진행 표시: 진행 중일 때만 주기적으로 자기 자신만 다시 실행하고, 끝나면 전체를 다시 그린다
+@st.fragment(run_every=FETCH_POLL_SEC if job else None)
+def fetch_progress():
+    job = st.session_state.fetch_job
+    if not job:
+        return
+    if job["future"].done():
+        st.rerun()
+    st.caption(f"⏳ {job['ym']} 데이터 불러오는 중... ({int(time.time() - job['started'])}초)")
+fetch_progress()
 st.markdown('<div class="hr"></div>', unsafe_allow_html=True)
 
 # ============ 1행(3열): NOW TREND | 연휴상황 | 인기검색어 Top10 ============
+# 섹션마다 독립 조각: 국가 변경은 국가 의존 조각만, 각 조각 안의 위젯은 자기 조각만 다시 실행
 col_now, col_holiday, col_search = st.columns([2, 1, 1], gap="large")
 
-ats = data.get("ats") or {}
-regions = ats.get("regions") or []
-def pick_region_info(code):
-    for r in regions:
-        if r.get("region") == code:
-            return r
-    return {"region": code}
-info = pick_region_info(rg)
-
 # 1-1) NOW TREND
-with col_now:
+@st.fragment(key="now_trend")
+def now_trend(views):
     st.markdown('<span class="section-title">🌏 NOW TREND</span>', unsafe_allow_html=True)
-    hs = (info.get("hashtags") or {})
-
-    macro_txt   = info.get("macro_issue")
-    shop_txt    = info.get("shopping_trend")
-    cons_txt    = info.get("consumer_behavior")
-    travel_txt  = info.get("travel_leisure")
-    brand_txt   = info.get("brand_highlight")
-    promo_txt   = info.get("promotion_implication")
-
-    st.write("**🌤️ 주요 이슈**")
-    render_hashtag_pills(hs.get("macro_issue"))
-    items = _as_list(macro_txt); st.write("\n".join([f"- {it}" for it in items]) if items else (f"- {macro_txt}" if (macro_txt or "").strip() else ""))
-
-    st.write("**🛍️ 쇼핑 트렌드**")
-    render_hashtag_pills(hs.get("shopping_trend"))
-    items = _as_list(shop_txt); st.write("\n".join([f"- {it}" for it in items]) if items else (f"- {shop_txt}" if (shop_txt or "").strip() else ""))
-
-    st.write("**👥 소비자 행동**")
-    render_hashtag_pills(hs.get("consumer_behavior"))
-    items = _as_list(cons_txt); st.write("\n".join([f"- {it}" for it in items]) if items else (f"- {cons_txt}" if (cons_txt or "").strip() else ""))
-
-    st.write("**✈️ 여행·레저**")
-    render_hashtag_pills(hs.get("travel_leisure"))
-    items = _as_list(travel_txt); st.write("\n".join([f"- {it}" for it in items]) if items else (f"- {travel_txt}" if (travel_txt or "").strip() else ""))
+    for title, pills, bullets in views["regions"][st.session_state.region].trend:
+        st.write(f"**{title}**")
+        if pills:
+            st.markdown(pills, unsafe_allow_html=True)
+        st.write(bullets)
 
-    st.write("**🏷️ 카테고리/브랜드**")
-    render_hashtag_pills(hs.get("brand_highlight"))
-    items = _as_list(brand_txt); st.write("\n".join([f"- {it}" for it in items]) if items else (f"- {brand_txt}" if (brand_txt or "").strip() else ""))
-
-    st.write("**🎯 프로모션 시사점**")
-    render_hashtag_pills(hs.get("promotion_implication"))
-    items = _as_list(promo_txt); st.write("\n".join([f"- {it}" for it in items]) if items else (f"- {promo_txt}" if (promo_txt or "").strip() else ""))
+with col_now:
+    now_trend(views)
 
 # 1-2) 연휴상황
-with col_holiday:
+@st.fragment(key="holidays")
+def holiday_status(views):
+    rg = st.session_state.region
     st.markdown('<span class="section-title">🗓️ 연휴 상황</span>', unsafe_allow_html=True)
-    cal = data.get("calendar") or []
-    names = []
-    if cal:
-        cal_df = pd.DataFrame(cal)
-        try:
-            month_int = int(ym.split("-")[1])
-        except Exception:
-            month_int = None
-
-        if "date" in cal_df.columns and pd.api.types.is_numeric_dtype(cal_df["date"]):
-            tmp = cal_df[cal_df["date"].astype("Int64") == month_int].copy() if month_int else cal_df.head(0)
-        else:
-            cal_df["date_dt"] = pd.to_datetime(cal_df["date"], errors="coerce")
-            cal_df["mm"] = cal_df["date_dt"].dt.month
-            tmp = cal_df[cal_df["mm"] == month_int].copy() if month_int else cal_df.head(0)
-
-        if "country" in tmp.columns and "name" in tmp.columns:
-            names = tmp[tmp["country"] == rg]["name"].dropna().astype(str).unique().tolist()
-
+    names = views["regions"][rg].holidays
     if not names:
         skeleton_holidays(rg)
     else:
@@ -393,158 +564,232 @@ with col_holiday:
             st.markdown(f"**{flag(rg)} {rg}**")
             st.write("• " + "\n• ".join(names))
 
-# 1-3) 인기검색어 Top10
-with col_search:
+with col_holiday:
+    holiday_status(views)
+
+# 1-3) 인기검색어 Top10 (월에만 의존, 국가 변경 시 다시 실행하지 않음)
+@st.fragment(key="search_top")
+def search_top(views):
     st.markdown('<span class="section-title">🔎 인기검색어 Top 10</span>', unsafe_allow_html=True)
-    def get_search_topN_df(data_dict, ym_str, topn=10):
-        df = pd.DataFrame(data_dict.get("search_data") or [])
-        if df.empty:
-            return df
-        df = df.rename(columns={c: str(c).strip().lower() for c in df.columns})
-        if "month" not in df.columns: df["month"] = None
-        if "rank" not in df.columns: df["rank"] = None
-        if "keyword" not in df.columns:
-            key_col = next((c for c in df.columns if "key" in c), None)
-            df["keyword"] = df.get(key_col, "")
-        if "search_volume" in df.columns:
-            df["search_value"] = pd.to_numeric(df["search_volume"], errors="coerce").fillna(0)
-        else:
-            df["search_value"] = pd.to_numeric(df.get("volume", 0), errors="coerce").fillna(0)
-
-        df["rank"] = pd.to_numeric(df["rank"], errors="coerce").fillna(999).astype(int)
-
-        def _mm_any(x):
-            if x is None: return None
-            if isinstance(x, (int, float)):
-                mm = int(x);  return mm if 1 <= mm <= 12 else None
-            t = str(x).strip()
-            if not t: return None
-            m = re.search(r"20\d{2}[-/\.]?(\d{1,2})", t)
-            if m:
-                mm = int(m.group(1));  return mm if 1 <= mm <= 12 else None
-            m2 = re.fullmatch(r"(\d{1,2})", t)
-            if m2:
-                mm = int(m2.group(1));  return mm if 1 <= mm <= 12 else None
-            m3 = re.search(r"(\d{1,2})\s*월", t)
-            if m3:
-                mm = int(m3.group(1));  return mm if 1 <= mm <= 12 else None
-            return None
+    s_df = views["search"]
+    if s_df.empty:
+        skeleton_search_topN(10)
+    else:
+        with METRICS.timer("render_search"):
+            st.dataframe(
+                s_df.rename(columns={"keyword":"keyword","rank":"rank","search_value":"search_value"}),
+                width="stretch", hide_index=True
+            )
 
-        try:
-            req_mm = int(str(ym_str).split("-")[1])
-        except Exception:
-            req_mm = None
+with col_search:
+    search_top(views)
 
-        if req_mm is not None:
-            df = df[df["month"].apply(lambda x: _mm_any(x) == req_mm)]
-        if df.empty:
-            return df
+st.markdown('<div class="hr"></div>', unsafe_allow_html=True)
 
-        if (df["rank"] < 999).any():
-            df = df.sort_values(["rank", "search_value"], ascending=[True, False])
-        else:
-            df = df.sort_values("search_value", ascending=False)
+# =========================
+# 2행: 🛒 프로모션 컨셉&상품추천 (테마 4개 + 테마별 5개)
+# =========================
+@st.fragment(key="promotions")
+def promotions(views):
+    st.markdown('<span class="section-title">🛒 프로모션 컨셉&상품추천</span>', unsafe_allow_html=True)
+    tables = views["regions"][st.session_state.region].themes
+    if not tables:
+        st.caption("프로모션 컨셉 추천 데이터가 없습니다.")
+    else:
+        st.markdown("".join([f'<span class="theme-badge">{badge}</span>' for _, badge, _ in tables]), unsafe_allow_html=True)
+        with METRICS.timer("render_promotions"):
+            for title, _, df_view in tables:
+                st.markdown(f"**• {title}**")
+                st.dataframe(df_view, width="stretch", hide_index=True)
 
-        return df.head(topn)[["keyword","rank","search_value"]]
+promotions(views)
 
-    s_df = get_search_topN_df(data, ym, topn=10)
-    if s_df.empty:
-        skeleton_search_topN(10)
-    else:
-        st.dataframe(
-            s_df.rename(columns={"keyword":"keyword","rank":"rank","search_value":"search_value"}),
-            use_container_width=True, hide_index=True
+# =========================
+# 📅 여러 달 비교 (분기 기획용)
+# =========================
+bulk_job = st.session_state.bulk_job
+
+# 수집 중일 때만 이 조각을 주기적으로 다시 실행해 완료를 확인 (fetch_progress 와 같은 방식)
+@st.fragment(run_every=FETCH_POLL_SEC if bulk_job and not bulk_job["future"].done() else None)
+def bulk_compare():
+    job = st.session_state.bulk_job
+    running = bool(job and not job["future"].done())
+    c1, c2 = st.columns([3, 1])
+    with c1:
+        n_months = st.slider("개월 수", min_value=2, max_value=6, value=3, key="bulk_n")
+    months = month_range(st.session_state.selected_ym, n_months)
+    with c2:
+        st.write("")
+        if st.button("비교 불러오기", width="stretch", disabled=running):
+            # 월별 호출을 동시에 보낸다 (최대 BULK_WORKERS, 429 면 자동으로 줄임)
+            st.session_state.bulk_job = {
+                "months": months,
+                "future": get_fetch_executor().submit(get_bulk_fetcher().fetch, DEFAULT_WEBHOOK, months),
+                "started": time.time(),
+                "polling": True,
+            }
+            st.rerun()
+    st.caption(f"{months[0]} ~ {months[-1]} · 월×국가 비교")
+    if not job:
+        return
+    if running:
+        st.caption(f"⏳ {len(job['months'])}개월 불러오는 중... ({int(time.time() - job['started'])}초)")
+        return
+    if job["polling"]:
+        job["polling"] = False
+        st.rerun()  # 주기 실행을 끄기 위해 전체를 한 번 다시 그림
+    try:
+        results = job["future"].result()
+    except Exception as e:
+        st.error(f"여러 달 수집 실패: {e}")
+        return
+    failed = [m for m, r in results.items() if isinstance(r, Exception)]
+    if failed:
+        st.warning(f"일부 월 수집 실패: {', '.join(failed)}")
+    payloads = {m: r if isinstance(r, Exception) else r.payload for m, r in results.items()}
+    st.dataframe(compare_months(payloads, REGIONS), width="stretch", hide_index=True)
+
+st.markdown('<div class="hr"></div>', unsafe_allow_html=True)
+with st.expander("📅 여러 달 비교"):
+    bulk_compare()
+
+# =========================
+# 📈 월별 추이 (받아 둔 달의 Parquet 이력에서 조회, webhook 호출 없음)
+# =========================
+@st.fragment(key="history_view")
+def history_view():
+    history = get_history_store()
+    if not history.enabled:
+        st.caption("pyarrow 가 없어 이력 저장소를 쓸 수 없습니다.")
+        return
+    stored = history.months()
+    if not stored:
+        st.caption("아직 저장된 달이 없습니다. 데이터를 불러오면 달마다 쌓입니다.")
+        return
+    c1, c2 = st.columns([1, 1])
+    with c1:
+        n_months = st.slider("기간 (개월)", min_value=3, max_value=24, value=12, key="hist_n")
+    with c2:
+        h_rg = st.selectbox("국가", REGIONS, index=REGIONS.index(st.session_state.region),
+                            format_func=lambda k: f"{flag(k)} {k}", key="hist_region")
+    months = month_range(shift_month(st.session_state.selected_ym, -(n_months - 1)), n_months)
+    with METRICS.timer("history_query", kind="keywords"):
+        options = history.top_keywords(months, h_rg)
+    picked = st.session_state.get("hist_keyword")
+    if picked and picked not in options:       # 기간/국가를 바꿔도 고른(입력한) 키워드는 유지
+        options = [picked] + options
+    keyword = st.selectbox("키워드", options, index=0 if options else None, accept_new_options=True,
+                           placeholder="키워드 선택 또는 입력", key="hist_keyword")
+    if keyword:
+        with METRICS.timer("history_query", kind="trend"):
+            trend = history.keyword_trend(keyword, months, h_rg)
+        chart = alt.Chart(trend.dropna(subset=["rank"])).mark_line(point=True).encode(
+            x=alt.X("month:O", title="월"),
+            y=alt.Y("rank:Q", title="순위", scale=alt.Scale(reverse=True)),
+            tooltip=["month", "rank", "search_volume"],
         )
+        st.altair_chart(chart, width="stretch")
+        st.dataframe(trend.rename(columns={"month": "월", "rank": "순위", "search_volume": "검색량"}),
+                     width="stretch", hide_index=True)
+    with METRICS.timer("history_query", kind="summary"):
+        summary = history.month_summary(months, h_rg)
+    st.dataframe(summary.rename(columns={"month": "월", "holidays": "연휴 수", "top_item": "최고 점수 상품",
+                                         "top_score": "최고 점수", "stored": "저장됨"}),
+                 width="stretch", hide_index=True)
+    st.caption(f"저장된 달 {len(stored)}개 ({stored[0]} ~ {stored[-1]}) · 로컬 이력에서 조회")
 
 st.markdown('<div class="hr"></div>', unsafe_allow_html=True)
+with st.expander("📈 월별 추이"):
+    history_view()
 
 # =========================
-# 2행: 🛒 프로모션 컨셉&상품추천 (테마 4개 + 테마별 5개)
+# ⬇️ 기획표 내보내기 (네 국가 × 여러 달, zip)
 # =========================
-st.markdown('<span class="section-title">🛒 프로모션 컨셉&상품추천</span>', unsafe_allow_html=True)
-region_blocks = data.get("promotions_by_region") or []
-region_promo = next((b for b in region_blocks if b.get("region") == st.session_state.region), None)
-promo_items = (region_promo or {}).get("items") or []
-
-def get_rec_items(data_dict, region_code):
-    blocks = data_dict.get("recommended_products_by_region") or []
-    for b in blocks:
-        if b.get("region") == region_code:
-            return b.get("items") or []
-    return []
-rec_items_all = get_rec_items(data, st.session_state.region)
-
-def score_total(it):
-    sc = it.get("scores") or {}
-    v = sc.get("final", sc.get("total"))
-    try:
-        return float(v)
-    except Exception:
-        return None
-rec_sorted_all = sorted(rec_items_all, key=lambda x: (score_total(x) or -1), reverse=True)
-
-seen_theme = set()
-themes = []
-for it in promo_items:
-    th = (it.get("theme") or "").strip()
-    if not th or th in seen_theme:
-        continue
-    themes.append(it)
-    seen_theme.add(th)
-    if len(themes) >= 4:
-        break
-
-if not themes:
-    st.caption("프로모션 컨셉 추천 데이터가 없습니다.")
-else:
-    st.markdown("".join([f'<span class="theme-badge">{(t.get("theme") or "테마")}</span>' for t in themes]), unsafe_allow_html=True)
-
-    used_skus = set()
-    for t in themes:
-        theme_txt = (t.get("theme") or "").lower()
-        prod_keywords = [str(x).lower() for x in (t.get("products") or []) if str(x).strip()]
-
-        tokens = []
-        if theme_txt:
-            tokens += re.split(r"[\s,\/\|·•]+", theme_txt)
-        tokens += prod_keywords
-        tokens = [w.strip() for w in tokens if w.strip()]
-        tokens = list(dict.fromkeys(tokens))
-
-        def _match_score(item):
-            txt = f"{str(item.get('name','')).lower()} {str(item.get('category','')).lower()}"
-            hit = 0
-            for w in tokens:
-                if w and w in txt:
-                    hit += 1
-            base = score_total(item) or 0
-            return (hit, base)
-
-        pool = [x for x in rec_sorted_all if x.get("sku") not in used_skus]
-        matched = sorted(pool, key=lambda x: _match_score(x), reverse=True)
-        top5 = matched[:5] if matched else rec_sorted_all[:5]
-        for it in top5:
-            if it.get("sku"):
-                used_skus.add(it["sku"])
-
-        rows = []
-        for it in top5:
-            rows.append({
-                "상품명": it.get("name"),
-                "카테고리": it.get("category"),
-                "재고": it.get("stock"),
-                "score_total": score_total(it),
-                "suggested_mechanic": it.get("suggested_mechanic"),
-            })
-        df_view = pd.DataFrame(rows)
-        if "score_total" in df_view.columns:
-            df_view["score_total"] = pd.to_numeric(df_view["score_total"], errors="coerce")
-            df_view = df_view.sort_values("score_total", ascending=False)
-
-        st.markdown(f"**• {t.get('theme','테마')}**")
-        st.dataframe(df_view.reset_index(drop=True), use_container_width=True, hide_index=True)
+@st.fragment(key="plan_export")
+def plan_export():
+    c1, c2 = st.columns([2, 1])
+    with c1:
+        n_months = st.slider("개월 수", min_value=1, max_value=12, value=1, key="export_n")
+    with c2:
+        formats = ["CSV", "XLSX"] if xlsx_available() else ["CSV"]
+        fmt = st.radio("형식", formats, horizontal=True, key="export_fmt")
+    with_rec = st.checkbox("추천 상품 전체 포함", value=False, key="export_rec")
+    months = month_range(st.session_state.selected_ym, n_months)
+
+    def _build():
+        # 눌렀을 때만 만든다. 기간 전체를 먼저 동시에 받고(캐시/n8n) (월, 국가) 묶음씩 압축 (완성된 zip 은 bytes 로 넘긴다)
+        with METRICS.timer("export", months=len(months), fmt=fmt):
+            got = get_bulk_fetcher().fetch(DEFAULT_WEBHOOK, months)
+
+            def _payload(m):
+                # 실패한 달은 iter_zip 이 그 달 ERROR.txt 로 남긴다
+                if isinstance(got[m], Exception):
+                    raise got[m]
+                return got[m].payload
+
+            return zip_bytes(iter_zip(_payload, months, REGIONS, fmt=fmt.lower(), with_recommended=with_rec))
+
+    st.download_button("⬇️ zip 내려받기", data=_build, file_name=f"promo_plans_{months[0]}_{months[-1]}.zip",
+                       mime="application/zip", on_click="ignore", width="stretch")
+    note = "" if xlsx_available() else " · XLSX 는 xlsxwriter 또는 openpyxl 설치 시 사용 가능"
+    st.caption(f"{months[0]} ~ {months[-1]} · {', '.join(REGIONS)} · 국가별 테마 추천 상품{note}")
+
+st.markdown('<div class="hr"></div>', unsafe_allow_html=True)
+with st.expander("⬇️ 기획표 내보내기"):
+    plan_export()
 
 # Raw JSON
+@st.cache_resource(max_entries=4, show_spinner=False)
+def raw_json_dict(content_hash: str, _data):
+    return _data.to_dict()
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def raw_json_lines(content_hash: str, _data):
+    # 같은 payload 는 프로세스에서 한 번만 직렬화 (세션 간 공유, 읽기 전용)
+    return dumps(raw_json_dict(content_hash, _data), indent=True).splitlines()
+
+# 토글/보기 방식/페이지 이동은 이 조각만 다시 실행
+@st.fragment(key="raw_view")
+def raw_view(data):
+    # expander 는 접혀 있어도 본문이 실행되므로, 켤 때만 직렬화
+    if data.is_empty():
+        st.code("{}")
+    elif st.toggle("Raw JSON 보기", key="raw_on"):
+        raw_mode = st.radio("보기 방식", ["트리", "텍스트"], horizontal=True, key="raw_mode", label_visibility="collapsed")
+        if raw_mode == "트리":
+            raw = raw_json_dict(payload_hash(data), data)
+            raw_key = st.selectbox("키", list(raw.keys()), key="raw_key")
+            st.json(raw.get(raw_key), expanded=1)
+        else:
+            lines = raw_json_lines(payload_hash(data), data)
+            n_pages = max(1, -(-len(lines) // RAW_PAGE_LINES))
+            page = st.number_input("페이지", min_value=1, max_value=n_pages, value=1, key="raw_page") if n_pages > 1 else 1
+            st.code("\n".join(lines[(page - 1) * RAW_PAGE_LINES: page * RAW_PAGE_LINES]), language="json")
+            st.caption(f"{page}/{n_pages} 페이지 · {len(lines):,}줄")
+
 st.markdown('<div class="hr"></div>', unsafe_allow_html=True)
 with st.expander("🔎 Raw JSON"):
-    st.code(json.dumps(data or {}, ensure_ascii=False, indent=2))
+    raw_view(data)
+
+# 디버그 패널 (?debug=1 또는 N8N_DEBUG=1): 단계별 소요 시간 + 캐시/응답 카운터
+METRICS.record("page", time.perf_counter() - _page_t0, region=rg)
+METRICS.set("coalesced_calls", get_payload_cache().coalesced)
+METRICS.set("payload_store_entries", len(get_payload_store()))
+METRICS.set("payload_store_deduped", get_payload_store().deduped)
+METRICS.set("circuit_open", int(get_circuit_breaker(DEFAULT_WEBHOOK).state == OPEN))
+for k, v in pool_stats(get_http_session()).items():
+    METRICS.set(f"http_pool_{k}", v)
+if DEBUG_PANEL or st.query_params.get("debug") == "1":
+    snap = METRICS.snapshot()
+    st.markdown('<div class="hr"></div>', unsafe_allow_html=True)
+    with st.expander("🛠️ 디버그: 단계별 성능", expanded=True):
+        st.dataframe(pd.DataFrame([
+            {"단계": k, "횟수": v["count"], "평균 ms": round(v["sum"] / v["count"] * 1000, 2),
+             "최대 ms": round(v["max"] * 1000, 2), "마지막 ms": round(v["last"] * 1000, 2)}
+            for k, v in sorted(snap["stages"].items())
+        ]), width="stretch", hide_index=True)
+        counters = [{"지표": n, "라벨": ", ".join(f"{k}={v}" for k, v in l), "값": v} for (n, l), v in snap["counters"].items()]
+        counters += [{"지표": n, "라벨": ", ".join(f"{k}={v}" for k, v in l), "값": v} for (n, l), v in snap["gauges"].items()]
+        st.dataframe(pd.DataFrame(counters), width="stretch", hide_index=True)
+        if METRICS_PORT > 0:
+            st.caption(f"텍스트 지표: :{METRICS_PORT}/metrics")
@@ -0,0 +1,5 @@
+# tests/conftest.py
+# 앱 모듈은 저장소 루트에 평평하게 있으므로 루트를 import 경로에 넣는다.
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
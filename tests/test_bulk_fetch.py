@@ -0,0 +1,33 @@
+# tests/test_bulk_fetch.py
+import requests
+from urllib3.exceptions import MaxRetryError, ResponseError
+
+from bulk_fetch import is_rate_limited, month_range
+
+URL = "/webhook/0b4294ff-1c2d-4e5f-8a9b-000000000429"
+
+
+def _retry_error(status):
+    reason = ResponseError(ResponseError.SPECIFIC_ERROR.format(status_code=status))
+    return requests.exceptions.RetryError(MaxRetryError(None, URL, reason=reason))
+
+
+def _http_error(status):
+    resp = requests.Response()
+    resp.status_code = status
+    return requests.exceptions.HTTPError(str(status), response=resp)
+
+
+def test_is_rate_limited_reads_status_not_message():
+    assert is_rate_limited(_http_error(429))
+    assert is_rate_limited(_retry_error(429))
+    assert "429" in str(_retry_error(503))              # URL 에 429 가 있어도
+    assert not is_rate_limited(_retry_error(503))
+    assert not is_rate_limited(_http_error(503))
+    assert not is_rate_limited(requests.exceptions.RetryError(MaxRetryError(None, URL, reason=None)))
+    assert not is_rate_limited(ValueError("429"))
+
+
+def test_month_range_wraps_year():
+    assert month_range("2025-11", 4) == ["2025-11", "2025-12", "2026-01", "2026-02"]
+    assert month_range("2025-11", 0) == []
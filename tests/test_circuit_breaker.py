@@ -0,0 +1,88 @@
+# tests/test_circuit_breaker.py
+import pytest
+import requests
+
+import circuit_breaker as cb
+from bulk_fetch import is_rate_limited
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cb.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _boom():
+    raise ConnectionError("down")
+
+
+def _rate_limited():
+    resp = requests.Response()
+    resp.status_code = 429
+    raise requests.exceptions.HTTPError("429", response=resp)
+
+
+def _fail(b, fn=_boom, exc=ConnectionError):
+    with pytest.raises(exc):
+        b.call(fn)
+
+
+def test_opens_after_threshold_and_blocks(clock):
+    b = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    _fail(b)
+    _fail(b)
+    assert b.state == CLOSED
+    _fail(b)
+    assert b.state == OPEN
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        b.call(lambda: calls.append(1))
+    assert calls == [] and b.retry_in() == 30
+
+
+def test_success_resets_failure_count(clock):
+    b = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    _fail(b)
+    assert b.call(lambda: "ok") == "ok"
+    _fail(b)
+    assert b.state == CLOSED
+
+
+def test_half_open_allows_single_trial(clock):
+    b = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    _fail(b)
+    clock[0] += 30
+    assert b.state == HALF_OPEN
+    b.before_call()                                 # 시험 호출 진행 중
+    with pytest.raises(CircuitOpenError):
+        b.before_call()
+    b.record_success()
+    assert b.state == CLOSED
+
+
+def test_half_open_failure_reopens(clock):
+    b = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(3):
+        _fail(b)
+    clock[0] += 31
+    _fail(b)
+    assert b.state == OPEN and b.retry_in() == 30
+
+
+def test_ignored_errors_do_not_count(clock):
+    b = CircuitBreaker(failure_threshold=1, reset_timeout=30, ignore=is_rate_limited)
+    for _ in range(5):
+        _fail(b, _rate_limited, requests.exceptions.HTTPError)
+    assert b.state == CLOSED
+
+
+def test_ignored_error_releases_half_open_trial(clock):
+    b = CircuitBreaker(failure_threshold=1, reset_timeout=30, ignore=is_rate_limited)
+    _fail(b)
+    clock[0] += 30
+    _fail(b, _rate_limited, requests.exceptions.HTTPError)
+    assert b.state == HALF_OPEN                     # 429 는 복구 여부를 알려 주지 않으므로 다음 시험을 허용
+    assert b.call(lambda: 1) == 1
+    assert b.state == CLOSED
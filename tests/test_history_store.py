@@ -0,0 +1,81 @@
+# tests/test_history_store.py
+import glob, os, threading
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from benchmarks.synthetic import make_payload
+from history_store import HistoryStore, _file_token
+from payload_model import normalize_payload
+
+
+def _payload(month, seed):
+    return normalize_payload(make_payload(month, 200, rec_per_region=20, seed=seed), content_hash=f"h{seed}")
+
+
+def _versions(root, month):
+    files = glob.glob(os.path.join(root, "recommended", f"month={month}", "region=*", "part-*.parquet"))
+    return {os.path.basename(f)[len("part-"):-len(".parquet")] for f in files}
+
+
+def test_rewrite_flips_version_and_prunes(tmp_path):
+    root = str(tmp_path)
+    h = HistoryStore(root)
+    p0, p1, p2 = (_payload("2025-03", s) for s in range(3))
+    assert h.append("2025-03", p0)
+    assert not h.append("2025-03", p0)
+    assert h.append("2025-03", p1)
+    assert _versions(root, "2025-03") == {_file_token("h0"), _file_token("h1")}      # 직전 버전은 한 번 더 남긴다
+    assert h.append("2025-03", p2)
+    assert _versions(root, "2025-03") == {_file_token("h1"), _file_token("h2")}
+    rec = h._scan("recommended", ["name", "score"], ["2025-03"], ["KR"])
+    assert len(rec) == len(p2.rec_items("KR"))
+    assert HistoryStore(root).months() == ["2025-03"]
+
+
+def test_reads_during_rewrites_see_one_whole_version(tmp_path):
+    h = HistoryStore(str(tmp_path))
+    payloads = [_payload("2025-04", s) for s in range(2)]
+    sizes = {len(p.rec_items("JP")) for p in payloads}
+    h.append("2025-04", payloads[0])
+    stop = threading.Event()
+
+    def writer():
+        i = 1
+        while not stop.is_set():
+            h.append("2025-04", payloads[i % 2])
+            i += 1
+
+    t = threading.Thread(target=writer)
+    t.start()
+    try:
+        for _ in range(50):
+            assert len(h._scan("recommended", ["name"], ["2025-04"], ["JP"])) in sizes
+    finally:
+        stop.set()
+        t.join()
+
+
+def test_missing_files_give_empty_frame(tmp_path):
+    h = HistoryStore(str(tmp_path))
+    h.append("2025-05", _payload("2025-05", 0))
+    for f in glob.glob(os.path.join(str(tmp_path), "search", "**", "*.parquet"), recursive=True):
+        os.remove(f)
+    assert h.top_keywords(["2025-05"], "KR") == []
+    assert h.keyword_trend("x", ["2025-05"], "KR")["rank"].isna().all()
+
+
+def test_unsafe_version_and_region_stay_inside_the_tree(tmp_path):
+    root = tmp_path / "hist"
+    raw = make_payload("2025-07", 50, rec_per_region=5)
+    raw["recommended_products_by_region"].append({"region": "../../escape", "items": [{"name": "x", "scores": {"final": 1}}]})
+    h = HistoryStore(str(root))
+    assert h.append("2025-07", normalize_payload(raw, content_hash="abc/def+=="))
+    assert not (tmp_path / "escape").exists()
+    files = glob.glob(os.path.join(str(root), "**", "*.parquet"), recursive=True)
+    assert files and all(os.path.abspath(f).startswith(str(root) + os.sep) for f in files)
+    rec = h._scan("recommended", ["name"], ["2025-07"], ["../../escape"])
+    assert rec["name"].tolist() == ["x"] and rec["region"].tolist() == ["../../escape"]
+    with pytest.raises(ValueError):
+        h.append("../2025-07", _payload("2025-07", 1))
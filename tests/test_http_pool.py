@@ -0,0 +1,77 @@
+# tests/test_http_pool.py
+# request_deadline: 멈춘 서버/재시도 대기가 마감을 넘기지 않는지 (로컬 서버)
+import socket, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from http_pool import build_session
+from n8n_client import fetch_payload
+
+
+@pytest.fixture
+def hung_server():
+    # 연결은 받지만 응답하지 않는다
+    srv = socket.socket()
+    srv.bind(("127.0.0.1", 0))
+    srv.listen(16)
+    conns = []
+    stop = threading.Event()
+
+    def accept():
+        srv.settimeout(0.1)
+        while not stop.is_set():
+            try:
+                conns.append(srv.accept()[0])
+            except OSError:
+                pass
+
+    t = threading.Thread(target=accept, daemon=True)
+    t.start()
+    yield f"http://127.0.0.1:{srv.getsockname()[1]}/hook"
+    stop.set()
+    t.join()
+    for c in conns:
+        c.close()
+    srv.close()
+
+
+@pytest.fixture
+def busy_server():
+    # 항상 503 + 긴 Retry-After
+    class H(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.send_response(503)
+            self.send_header("Retry-After", "30")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *a):
+            pass
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), H)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_port}/hook"
+    srv.shutdown()
+    srv.server_close()
+
+
+def _elapsed(fn):
+    t0 = time.monotonic()
+    with pytest.raises((requests.exceptions.RequestException, TimeoutError)):
+        fn()
+    return time.monotonic() - t0
+
+
+def test_hung_server_is_cut_at_deadline(hung_server):
+    sess = build_session(retry_total=2, retry_backoff=0.1)
+    took = _elapsed(lambda: fetch_payload(sess, hung_server, "2025-01", timeout=(5, 120),
+                                          deadline=time.monotonic() + 0.5))
+    assert took < 1.5
+
+
+def test_retry_after_does_not_outlive_deadline(busy_server):
+    sess = build_session(retry_total=2, retry_backoff=0.1)
+    took = _elapsed(lambda: fetch_payload(sess, busy_server, "2025-01", deadline=time.monotonic() + 0.5))
+    assert took < 1.5
@@ -0,0 +1,85 @@
+# tests/test_jsonutil.py
+# load_selected 는 청크 경계와 무관하게 json.loads 후 keys 만 남긴 결과와 같아야 한다.
+import json
+
+import pytest
+
+from jsonutil import load_selected
+
+KEYS = ("reply", "ats", "search_data", 'q"uote', "키")
+
+
+def _expected(obj, keys=KEYS, wrapper="json"):
+    if isinstance(obj, dict):
+        return {k: v for k, v in obj.items() if k in keys}
+    if isinstance(obj, list):
+        return [
+            {k: (_expected(v, keys) if k == wrapper and isinstance(v, dict) else v)
+             for k, v in el.items() if k in keys or k == wrapper}
+            for el in obj if isinstance(el, dict)
+        ]
+    return obj
+
+
+def _chunks(b: bytes, n: int):
+    return [b[i:i + n] for i in range(0, len(b), n)]
+
+
+def _check(doc: bytes, sizes=None):
+    want = _expected(json.loads(doc))
+    for n in sizes or range(1, len(doc) + 1):
+        assert load_selected(_chunks(doc, n), KEYS) == want, n
+
+
+DOC = {
+    "reply": "줄\n바꿈 \"따옴표\" \\ 역슬래시 é 😀",
+    "skip_braces": "{[}]\" 닫힌 척 }}]]",
+    "skip_nested": {"a": [1, {"b": "}\\\\"}, [[], {}]], "c\\\"": {"d": "\\\""}},
+    'q"uote': [1, 2.5, -3e2, True, False, None],
+    "키": {"중첩": [{"x": "y"}, [{"z": []}]]},
+    "skip_scalar": 12345678901234567890,
+    "ats": {"month": "2025-06", "regions": [{"region": "KR", "tags": ["a", "b"]}]},
+}
+
+
+def test_object_every_chunk_size():
+    _check(json.dumps(DOC, ensure_ascii=False).encode("utf-8"))
+
+
+def test_object_escaped_ascii():
+    _check(json.dumps(DOC, ensure_ascii=True, indent=2).encode("utf-8"), sizes=range(1, 80))
+
+
+def test_array_with_wrapper():
+    doc = [{"json": DOC}, 1, "x", {"reply": "top", "skip": ["]"]}, {"json": "not a dict"}]
+    _check(json.dumps(doc, ensure_ascii=False).encode("utf-8"), sizes=range(1, 120))
+
+
+def test_large_skipped_value_uses_vector_scan():
+    # 괄호가 많은 큰 값은 numpy 스캔 경로를 탄다 (문자열 안 괄호/이스케이프 따옴표 포함)
+    big = [{"k": "}\\\"]" * (i % 3), "v": [[i], {"w": "\\\\"}]} for i in range(3000)]
+    doc = json.dumps({"skip": big, "reply": "끝", "skip2": {"s": "\\"}}, ensure_ascii=False).encode("utf-8")
+    _check(doc, sizes=(61, 4095, 4096, 65536, len(doc)))
+
+
+def test_non_container_and_bom():
+    assert load_selected(_chunks(b'"abc"', 2), KEYS) == "abc"
+    assert load_selected([b"\xef\xbb", b"\xbf{\"reply\": 1}"], KEYS) == {"reply": 1}
+    assert load_selected([b"{}"], KEYS) == {} and load_selected([b"[]"], KEYS) == []
+
+
+@pytest.mark.parametrize("doc", [
+    b'{"reply": [1, 2',
+    b'{"skip": {"a": 1',
+    b'{"skip": "unterminated',
+    b'{"reply": 1 "ats": 2}',
+    b'{"reply": 1,}',
+    b'{1: 2}',
+    b'[1 2]',
+    b'{"reply": 1} trailing',
+    b'{"reply": tru}',
+])
+def test_invalid_raises_value_error(doc):
+    for n in range(1, len(doc) + 1):
+        with pytest.raises(ValueError):
+            load_selected(_chunks(doc, n), KEYS)
@@ -0,0 +1,80 @@
+# tests/test_n8n_client.py
+import io, json
+
+import pytest
+import requests
+
+from benchmarks.synthetic import make_payload
+from n8n_client import fetch_payload
+from payload_model import normalize_payload
+
+
+def _response(status, body=b"", headers=None):
+    r = requests.Response()
+    r.status_code = status
+    r.raw = io.BytesIO(body)
+    r.headers.update(headers or {})
+    r.encoding = "utf-8"
+    return r
+
+
+class _Session:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    def post(self, url, data=None, timeout=None, stream=None, headers=None):
+        self.sent.append(dict(headers or {}))
+        return self.responses.pop(0)
+
+
+def _body(d):
+    return json.dumps(d, ensure_ascii=False).encode("utf-8")
+
+
+RAW = make_payload("2025-06", 50, rec_per_region=10)
+PREV = normalize_payload(RAW, content_hash="v1")
+
+
+def test_not_modified_returns_prev():
+    sess = _Session([_response(304)])
+    assert fetch_payload(sess, "http://x", "2025-06", prev=PREV) is PREV
+    assert sess.sent[0]["If-None-Match"] == '"v1"'
+
+
+def test_delta_with_etag_is_merged():
+    delta = {"reply": "바뀐 답변"}
+    sess = _Session([_response(200, _body(delta), {"ETag": '"v2"', "X-Delta-Base": '"v1"'})])
+    data = fetch_payload(sess, "http://x", "2025-06", prev=PREV)
+    assert data.reply == "바뀐 답변" and data.content_hash == "v2"
+    assert data.rec_by_region == PREV.rec_by_region
+
+
+def test_delta_without_etag_refetches_in_full():
+    full = dict(RAW, reply="전체 답변")
+    sess = _Session([
+        _response(200, _body({"reply": "바뀐 답변"}), {"X-Delta-Base": '"v1"'}),
+        _response(200, _body(full)),
+    ])
+    data = fetch_payload(sess, "http://x", "2025-06", prev=PREV)
+    assert "If-None-Match" not in sess.sent[1]
+    assert data.reply == "전체 답변" and data.rec_by_region == PREV.rec_by_region
+    assert data.content_hash and data.content_hash != "v1"      # 전체 본문의 sha1
+
+
+def test_delta_with_unknown_base_refetches_in_full():
+    sess = _Session([
+        _response(200, _body({"reply": "바뀐 답변"}), {"ETag": '"v3"', "X-Delta-Base": '"v0"'}),
+        _response(200, _body(RAW), {"ETag": '"v3"'}),
+    ])
+    data = fetch_payload(sess, "http://x", "2025-06", prev=PREV)
+    assert len(sess.sent) == 2 and "If-None-Match" not in sess.sent[1]
+    assert data.content_hash == "v3" and data.reply == PREV.reply
+
+
+def test_delta_to_unconditional_request_raises_after_one_retry():
+    delta = lambda: _response(200, _body({"reply": "x"}), {"X-Delta-Base": '"v1"'})
+    sess = _Session([delta() for _ in range(5)])
+    with pytest.raises(ValueError):
+        fetch_payload(sess, "http://x", "2025-06", prev=PREV)
+    assert len(sess.sent) == 2
@@ -0,0 +1,32 @@
+# tests/test_payload_cache.py
+import threading, time
+
+from payload_cache import PersistentCache
+
+
+def test_expired_hit_is_reported_stale_and_revalidated(tmp_path, monkeypatch):
+    import payload_cache as pc
+
+    now = [1000.0]
+    monkeypatch.setattr(pc.time, "time", lambda: now[0])
+    cache = PersistentCache(str(tmp_path / "c.sqlite3"), ttl=60)
+    done = threading.Event()
+    versions = iter(["v1", "v2"])
+
+    def loader(webhook, month, prev):
+        try:
+            return next(versions)
+        finally:
+            if prev is not None:
+                done.set()
+
+    assert cache.fetch("w", "2025-01", loader, with_freshness=True) == ("v1", True)
+    assert cache.fetch("w", "2025-01", loader, with_freshness=True) == ("v1", True)
+    now[0] += 61
+    # 만료: 기존 값을 바로 주되 fresh=False 로 알리고 뒤에서 갱신
+    assert cache.fetch("w", "2025-01", loader, with_freshness=True) == ("v1", False)
+    assert done.wait(5)
+    while cache.is_loading("w", "2025-01"):
+        time.sleep(0.01)
+    assert cache.fetch("w", "2025-01", loader, with_freshness=True) == ("v2", True)
+    assert cache.fetch("w", "2025-01", loader) == "v2"
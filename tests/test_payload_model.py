@@ -0,0 +1,28 @@
+# tests/test_payload_model.py
+from benchmarks.synthetic import make_payload
+from payload_model import RecItem, normalize_payload, payload_from_dict
+
+
+def _raw_items():
+    return [
+        {"sku": "A1", "name": "세럼", "stock": 3, "scores": {"final": "0.91", "trend": 0.7, "margin": 0.2}},
+        {"sku": "B2", "name": "크림", "scores": {"total": 0.55, "stock_risk": 0.1}, "badge": "new"},
+        {"sku": "C3", "name": "토너"},
+    ]
+
+
+def test_rec_item_keeps_original_scores():
+    a, b, c = (RecItem.from_dict(it) for it in _raw_items())
+    assert a.score == 0.91 and b.score == 0.55 and c.score is None
+    assert a.to_dict()["scores"] == {"final": "0.91", "trend": 0.7, "margin": 0.2}
+    assert b.to_dict() == _raw_items()[1]
+    assert "scores" not in c.to_dict()
+
+
+def test_payload_round_trip():
+    raw = make_payload("2025-03", 50, rec_per_region=20)
+    raw["recommended_products_by_region"].append({"region": "XX", "items": _raw_items()})
+    p = normalize_payload(raw, content_hash="h1")
+    q = payload_from_dict(p.to_dict())
+    assert q == p
+    assert [it.to_dict()["scores"] for it in q.rec_items("XX")[:2]] == [it["scores"] for it in _raw_items()[:2]]
@@ -0,0 +1,39 @@
+# tests/test_plan_export.py
+import csv, io, zipfile
+
+from benchmarks.synthetic import make_payload
+from payload_model import normalize_payload
+from plan_export import PLAN_COLUMNS, iter_zip, zip_bytes
+
+REGIONS = ["KR", "JP", "CN", "SEA"]
+
+
+def _loader(month):
+    if month == "2025-02":
+        raise RuntimeError("boom")
+    return normalize_payload(make_payload(month, 200, rec_per_region=30))
+
+
+def _build(months, **kw):
+    # 앱의 download_button 콜백과 같은 모양: 인자 없이 불려 zip 을 돌려준다
+    return lambda: zip_bytes(iter_zip(_loader, months, REGIONS, **kw))
+
+
+def test_download_callable_returns_zip_bytes():
+    data = _build(["2025-01", "2025-02", "2025-03"], with_recommended=True)()
+    assert isinstance(data, bytes)
+    zf = zipfile.ZipFile(io.BytesIO(data))
+    assert zf.testzip() is None
+    assert len(zf.namelist()) == 2 * len(REGIONS) * 2 + 1
+    assert zf.read("2025-02/ERROR.txt").startswith(b"RuntimeError: boom")
+
+
+def test_csv_rows_match_theme_tables():
+    from payload_views import theme_tables
+
+    zf = zipfile.ZipFile(io.BytesIO(_build(["2025-01"], batch_rows=3)()))
+    rows = list(csv.reader(io.TextIOWrapper(zf.open("2025-01/KR_plan.csv"), encoding="utf-8-sig")))
+    assert tuple(rows[0]) == PLAN_COLUMNS
+    expected = theme_tables(_loader("2025-01"), "KR")
+    assert len(rows) - 1 == sum(len(df) for _, _, df in expected)
+    assert rows[1][2] == expected[0][0]
@@ -0,0 +1,71 @@
+# tests/test_single_flight.py
+import threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def _start_followers(sf, key, fn, n):
+    # 리더가 fn 안에서 멈춰 있는 동안 n 개를 더 부르고, 모두 합쳐질 때까지 기다린다
+    pool = ThreadPoolExecutor(max_workers=n)
+    futs = [pool.submit(sf.do, key, fn) for _ in range(n)]
+    while sf.coalesced < n:
+        time.sleep(0.005)
+    return pool, futs
+
+
+def test_concurrent_calls_share_one_result():
+    sf = SingleFlight()
+    entered, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        entered.set()
+        release.wait(5)
+        return object()
+
+    leader_pool = ThreadPoolExecutor(max_workers=1)
+    leader = leader_pool.submit(sf.do, "k", fn)
+    assert entered.wait(5) and sf.inflight("k")
+    pool, futs = _start_followers(sf, "k", fn, 4)
+    release.set()
+    res = leader.result(5)
+    assert all(f.result(5) is res for f in futs)
+    assert calls == [1] and sf.coalesced == 4
+    assert not sf.inflight("k")
+    pool.shutdown()
+    leader_pool.shutdown()
+
+
+def test_exception_is_shared_and_key_released():
+    sf = SingleFlight()
+    entered, release = threading.Event(), threading.Event()
+
+    def fail():
+        entered.set()
+        release.wait(5)
+        raise RuntimeError("down")
+
+    leader_pool = ThreadPoolExecutor(max_workers=1)
+    leader = leader_pool.submit(sf.do, "k", fail)
+    assert entered.wait(5)
+    pool, futs = _start_followers(sf, "k", fail, 2)
+    release.set()
+    for f in [leader] + futs:
+        with pytest.raises(RuntimeError, match="down"):
+            f.result(5)
+    assert not sf.inflight("k")
+    assert sf.do("k", lambda: "ok") == "ok"          # 실패 뒤 같은 키는 새로 부른다
+    pool.shutdown()
+    leader_pool.shutdown()
+
+
+def test_distinct_keys_do_not_coalesce():
+    sf = SingleFlight()
+    assert sf.do("a", lambda: 1) == 1
+    assert sf.do("b", lambda: 2) == 2
+    assert sf.do("a", lambda: 3) == 3                # 끝난 호출은 결과를 남기지 않는다
+    assert sf.coalesced == 0